@@ -0,0 +1,180 @@
+# Author: Joseph D Tong
+# Date: 10/18/2026
+# Description: Validates a Xiangqi game archive across all CPU cores. Games are
+# split into chunks, each worker process replays its chunks through its own
+# XiangqiGame, and the per-game results are merged into a summary.
+
+import collections
+import multiprocessing
+import sys
+
+from XiangqiGame import XiangqiGame
+from XiangqiReplay import read_games, replay_games
+
+# Games per task sent to a worker. Replaying a game takes far longer than
+# sending it, so chunks of this size keep the cost of passing work between
+# processes small while still spreading uneven chunks over the workers.
+DEFAULT_CHUNK_SIZE = 64
+
+# Each worker process replays every chunk it is given through this game.
+_worker_game = None
+
+
+def _start_worker():
+    """Creates the XiangqiGame reused by a worker process."""
+    global _worker_game
+    _worker_game = XiangqiGame()
+
+
+def classify(xiangqi_game):
+    """
+    Returns "checkmate" if the player to move in the given XiangqiGame is in
+    check with no legal moves, "stalemate" if they have no legal moves but are
+    not in check, or "unfinished" otherwise.
+    """
+    player = xiangqi_game.get_turn()
+
+    if xiangqi_game.legal_moves(player):
+        return "unfinished"
+
+    if xiangqi_game.is_general_attacked(player):
+        return "checkmate"
+
+    return "stalemate"
+
+
+def _analyze_chunk(first_index, games, classify_games):
+    """
+    Replays a chunk of games in a worker process and returns a compact
+    (index, valid, moves played, invalid move, game state, classification,
+    captures, checks) tuple for each game. Indices count from first_index.
+    """
+    results = []
+
+    for result in replay_games(games, xiangqi_game=_worker_game):
+
+        # The game is still in its final position while its result is handled,
+        # so it can be classified here.
+        if classify_games and result["valid"]:
+            classification = classify(_worker_game)
+
+        else:
+            classification = None
+
+        results.append((first_index + result["index"], result["valid"],
+                        result["moves_played"], result["invalid_move"],
+                        result["game_state"], classification,
+                        result["captures"], result["checks"]))
+
+    return results
+
+
+def _chunks(games, chunk_size):
+    """Yields (first index, list of games) chunks of the given games."""
+    chunk = []
+    first_index = 0
+
+    for games_seen, moves in enumerate(games):
+        chunk.append(list(moves))
+
+        if len(chunk) == chunk_size:
+            yield first_index, chunk
+            first_index = games_seen + 1
+            chunk = []
+
+    if chunk:
+        yield first_index, chunk
+
+
+def iter_analysis(games, processes=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                  classify_games=False):
+    """
+    Yields a result tuple (see _analyze_chunk) for every game in games, in
+    order, replaying them across a pool of processes (one per CPU core by
+    default). Only a few chunks per process are in flight at a time, so games
+    can come from an iterator over an archive of any size.
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    with multiprocessing.Pool(processes, initializer=_start_worker) as pool:
+        pending = collections.deque()
+
+        for first_index, chunk in _chunks(games, chunk_size):
+            pending.append(pool.apply_async(_analyze_chunk, (
+                first_index, chunk, classify_games)))
+
+            # Waits for the oldest chunk once enough are queued, which keeps
+            # results in order and the number of chunks in memory bounded.
+            if len(pending) >= processes * 2:
+                yield from pending.popleft().get()
+
+        while pending:
+            yield from pending.popleft().get()
+
+
+def analyze_archive(games, processes=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                    classify_games=False):
+    """
+    Replays every game in games across a pool of processes and returns a
+    summary dictionary with the number of games, valid games, and moves
+    played, counts of final game states and (if classify_games is True)
+    classifications, total captures and checks, and the indices of the
+    invalid games.
+    """
+    summary = {"games": 0,
+               "valid": 0,
+               "moves": 0,
+               "captures": 0,
+               "checks": 0,
+               "game_states": collections.Counter(),
+               "classifications": collections.Counter(),
+               "invalid_games": []}
+
+    for (index, valid, moves_played, invalid_move, game_state, classification,
+         captures, checks) in iter_analysis(games, processes, chunk_size,
+                                            classify_games):
+        summary["games"] += 1
+        summary["moves"] += moves_played
+        summary["captures"] += captures
+        summary["checks"] += checks
+
+        if valid:
+            summary["valid"] += 1
+            summary["game_states"][game_state] += 1
+
+            if classification is not None:
+                summary["classifications"][classification] += 1
+
+        else:
+            summary["invalid_games"].append(index)
+
+    return summary
+
+
+def main():
+    # Analyzes the archive file named on the command line, one game per line,
+    # using the number of processes given after it or every core.
+    if len(sys.argv) > 2:
+        processes = int(sys.argv[2])
+
+    else:
+        processes = None
+
+    with open(sys.argv[1]) as archive:
+        summary = analyze_archive(read_games(archive), processes,
+                                  classify_games=True)
+
+    print("games:", summary["games"])
+    print("valid:", summary["valid"])
+    print("invalid:", len(summary["invalid_games"]), summary[
+        "invalid_games"][:20])
+    print("moves:", summary["moves"])
+    print("captures:", summary["captures"])
+    print("checks:", summary["checks"])
+    print("game states:", dict(summary["game_states"]))
+    print("classifications:", dict(summary["classifications"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# Author: Joseph D Tong
+# Date: 10/18/2026
+# Description: Builds and reads an opening book for XiangqiGame. The book is a
+# binary file of fixed-size (position hash, origin, destination, weight)
+# records sorted by hash, which is memory-mapped and binary-searched, so it
+# opens instantly at any size and its pages are shared by every process that
+# reads it. Build a book from an archive with
+# "python XiangqiBook.py archive.txt book.bin [plies]".
+
+import mmap
+import random
+import struct
+import sys
+
+from XiangqiGame import XiangqiGame, pos_index
+from XiangqiReplay import read_games
+
+# Each record is a big-endian 64-bit Zobrist hash, the origin and destination
+# flat board indices, and a 16-bit weight.
+_RECORD = struct.Struct(">QBBH")
+RECORD_SIZE = _RECORD.size
+
+# Weights are counts of how often a move was played, capped to fit a record.
+MAX_WEIGHT = 0xFFFF
+
+
+class OpeningBook:
+    """
+    Creates an OpeningBook object that reads the book file at the given path
+    through a read-only memory map.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as book_file:
+            size = book_file.seek(0, 2)
+
+            if size % RECORD_SIZE:
+                raise ValueError("opening book size is not a whole number of "
+                                 "records: " + repr(path))
+
+            # An empty file cannot be mapped, but is a valid empty book.
+            if size:
+                self._data = mmap.mmap(book_file.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+
+            else:
+                self._data = b""
+
+        self._records = size // RECORD_SIZE
+
+    def get_size(self):
+        """Returns the number of records in the OpeningBook."""
+        return self._records
+
+    def close(self):
+        """Unmaps the book file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+        self._data = b""
+        self._records = 0
+
+    def probe(self, key):
+        """
+        Returns a list of ((origin, destination), weight) pairs stored for the
+        given position hash, which is empty if the position is not in the book.
+        """
+        # Binary search for the first record whose hash is not below the key.
+        low = 0
+        high = self._records
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if _RECORD.unpack_from(self._data,
+                                   middle * RECORD_SIZE)[0] < key:
+                low = middle + 1
+
+            else:
+                high = middle
+
+        moves = []
+
+        for index in range(low, self._records):
+            record_key, origin, destination, weight = _RECORD.unpack_from(
+                self._data, index * RECORD_SIZE)
+
+            if record_key != key:
+                break
+
+            moves.append(((origin, destination), weight))
+
+        return moves
+
+    def get_moves(self, xiangqi_game):
+        """
+        Returns the book's ((origin, destination), weight) pairs for the
+        position of the given XiangqiGame, leaving out any move that is not
+        legal there (which could only come from a hash collision).
+        """
+        legal = xiangqi_game.legal_moves(xiangqi_game.get_turn())
+
+        return [(move, weight) for move, weight in self.probe(
+            xiangqi_game.get_hash()) if move in legal]
+
+    def choose_move(self, xiangqi_game, generator=random):
+        """
+        Returns a book move for the given XiangqiGame chosen at random in
+        proportion to the weights, or None if the position is not in the book
+        or only has moves of weight 0.
+        """
+        moves = [(move, weight) for move, weight in
+                 self.get_moves(xiangqi_game) if weight]
+
+        if not moves:
+            return None
+
+        return generator.choices([move for move, weight in moves],
+                                 [weight for move, weight in moves])[0]
+
+
+def write_book(path, entries):
+    """
+    Writes a book file at the given path from an iterable of (hash, (origin,
+    destination), weight) entries. Entries are sorted, repeated moves from the
+    same position have their weights added together, and moves whose total
+    weight is not positive are left out.
+    """
+    weights = {}
+
+    for key, move, weight in entries:
+        weights[key, move] = weights.get((key, move), 0) + weight
+
+    with open(path, "wb") as book_file:
+
+        for (key, (origin, destination)), weight in sorted(weights.items()):
+
+            # A move that is never chosen would only take up space, and a book
+            # of nothing else could not be chosen from.
+            if weight <= 0:
+                continue
+
+            book_file.write(_RECORD.pack(key, origin, destination,
+                                         min(weight, MAX_WEIGHT)))
+
+
+def book_entries(games, max_plies=20):
+    """
+    Yields a (hash, (origin, destination), 1) entry for each of the first
+    max_plies moves of each game, where games is an iterable of lists of
+    (origin, destination) positions. A game stops contributing at its first
+    invalid move.
+    """
+    xiangqi_game = XiangqiGame()
+
+    for moves in games:
+        xiangqi_game.reset()
+
+        for origin, destination in moves[:max_plies]:
+            key = xiangqi_game.get_hash()
+
+            if (origin not in xiangqi_game.get_board()
+                    or not xiangqi_game.make_move(origin, destination)):
+                break
+
+            yield key, (pos_index(origin), pos_index(destination)), 1
+
+
+def main():
+    # Builds a book from the archive file named on the command line, one game
+    # per line, and writes it to the second file named, using the number of
+    # plies given after that or 20.
+    if len(sys.argv) > 3:
+        max_plies = int(sys.argv[3])
+
+    else:
+        max_plies = 20
+
+    with open(sys.argv[1]) as archive:
+        write_book(sys.argv[2], book_entries(read_games(archive), max_plies))
+
+    book = OpeningBook(sys.argv[2])
+    print(book.get_size(), "records written to", sys.argv[2])
+    book.close()
+
+
+if __name__ == "__main__":
+    main()
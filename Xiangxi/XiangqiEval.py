@@ -0,0 +1,202 @@
+# Author: Joseph D Tong
+# Date: 10/18/2026
+# Description: Scores XiangqiGame positions by material and piece-square
+# tables, one game at a time or, with NumPy, a whole batch of positions stored
+# as an N x 90 array of piece codes.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from XiangqiGame import BLACK, UNIT_CODES
+
+# Material values indexed by the unit type bits of a piece code. The general
+# is never captured, so it is worth nothing.
+PIECE_VALUES = [0, 0, 20, 20, 40, 90, 45, 10]
+
+# Positional bonuses for each unit type, as seen by red. Each table lists the
+# ranks from 10 (the far side of the board) down to 1, and each rank from file
+# a to i. Black pieces use the same tables with the ranks reversed.
+PIECE_SQUARE_TABLES = {
+    "general": [
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, -2, -4, -2, 0, 0, 0,
+        0, 0, 0, -1, -2, -1, 0, 0, 0,
+        0, 0, 0, 1, 3, 1, 0, 0, 0],
+    "advisor": [
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 2, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0],
+    "elephant": [
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        -1, 0, 0, 0, 2, 0, 0, 0, -1,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 1, 0, 0, 0, 1, 0, 0],
+    "horse": [
+        2, 2, 2, 4, 2, 4, 2, 2, 2,
+        2, 4, 6, 6, 4, 6, 6, 4, 2,
+        2, 4, 6, 8, 6, 8, 6, 4, 2,
+        2, 6, 8, 8, 8, 8, 8, 6, 2,
+        2, 4, 6, 8, 8, 8, 6, 4, 2,
+        2, 4, 6, 6, 6, 6, 6, 4, 2,
+        0, 2, 4, 4, 4, 4, 4, 2, 0,
+        0, 2, 4, 2, 4, 2, 4, 2, 0,
+        -2, 0, 2, 2, -4, 2, 2, 0, -2,
+        0, -2, 0, 0, 0, 0, 0, -2, 0],
+    "chariot": [
+        4, 6, 5, 8, 8, 8, 5, 6, 4,
+        4, 8, 6, 10, 12, 10, 6, 8, 4,
+        4, 6, 5, 8, 8, 8, 5, 6, 4,
+        4, 8, 8, 10, 10, 10, 8, 8, 4,
+        4, 6, 6, 8, 8, 8, 6, 6, 4,
+        4, 6, 6, 8, 8, 8, 6, 6, 4,
+        2, 4, 4, 6, 6, 6, 4, 4, 2,
+        0, 4, 2, 4, 4, 4, 2, 4, 0,
+        2, 4, 2, 4, 0, 4, 2, 4, 2,
+        -2, 2, 0, 4, 0, 4, 0, 2, -2],
+    "cannon": [
+        4, 4, 0, -2, -4, -2, 0, 4, 4,
+        2, 2, 0, -2, -2, -2, 0, 2, 2,
+        2, 2, 0, -2, 2, -2, 0, 2, 2,
+        0, 0, 0, 0, 4, 0, 0, 0, 0,
+        0, 0, 0, 0, 4, 0, 0, 0, 0,
+        0, 0, 0, 0, 4, 0, 0, 0, 0,
+        0, 0, 0, 0, 2, 0, 0, 0, 0,
+        2, 0, 4, 2, 6, 2, 4, 0, 2,
+        0, 2, 2, 2, 2, 2, 2, 2, 0,
+        0, 0, 2, 4, 4, 4, 2, 0, 0],
+    "soldier": [
+        0, 0, 0, 1, 2, 1, 0, 0, 0,
+        12, 14, 16, 20, 22, 20, 16, 14, 12,
+        12, 14, 16, 18, 18, 18, 16, 14, 12,
+        10, 12, 14, 16, 16, 16, 14, 12, 10,
+        10, 10, 12, 12, 14, 12, 12, 10, 10,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, -2, 0, 4, 0, -2, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0],
+}
+
+
+def _build_score_table():
+    """
+    Returns a list indexed by piece code and then flat board index of the
+    material and positional value of that piece on that point, as a score for
+    red. Black pieces score negatively, and empty points and unused codes score
+    nothing.
+    """
+    scores = [[0] * 90 for code in range(16)]
+
+    for unit_type, table in PIECE_SQUARE_TABLES.items():
+        unit_code = UNIT_CODES[unit_type]
+
+        for square in range(90):
+            rank, file = divmod(square, 9)
+
+            # Table rows run from rank 10 down to rank 1 for red, and the
+            # other way round for black.
+            red_value = table[(9 - rank) * 9 + file]
+            black_value = table[rank * 9 + file]
+            scores[unit_code][square] = PIECE_VALUES[unit_code] + red_value
+            scores[unit_code | BLACK][square] = -(PIECE_VALUES[unit_code]
+                                                  + black_value)
+
+    return scores
+
+
+_SCORES = _build_score_table()
+
+# The same table as a 16 x 90 array for scoring batches, if NumPy is installed.
+if numpy is not None:
+    _SCORE_ARRAY = numpy.array(_SCORES, dtype=numpy.int32)
+
+
+def evaluate_cells(cells):
+    """
+    Returns the score for red of the position in the given sequence of 90
+    piece codes, such as XiangqiGame.get_cells().
+    """
+    score = 0
+
+    for square, code in enumerate(cells):
+
+        if code:
+            score += _SCORES[code][square]
+
+    return score
+
+
+def evaluate(xiangqi_game):
+    """
+    Returns a material and positional score for the given XiangqiGame from the
+    point of view of the player to move.
+    """
+    score = evaluate_cells(xiangqi_game.get_cells())
+
+    if xiangqi_game.get_turn() == "black":
+        return -score
+
+    return score
+
+
+def cells_array(xiangqi_games):
+    """
+    Returns the positions of the given XiangqiGames as an N x 90 NumPy array of
+    int8 piece codes, ready for evaluate_batch. Requires NumPy.
+    """
+    if numpy is None:
+        raise ImportError("cells_array requires NumPy")
+
+    data = b"".join(bytes(xiangqi_game.get_cells())
+                    for xiangqi_game in xiangqi_games)
+
+    return numpy.frombuffer(data, dtype=numpy.int8).reshape(-1, 90)
+
+
+def evaluate_batch(positions, black_to_move=None):
+    """
+    Returns the scores for red of a batch of positions, each a row of 90 piece
+    codes in an N x 90 array. If black_to_move is given (one True or False per
+    position), each score is instead from the point of view of the player to
+    move. With NumPy the whole batch is scored by indexing the score table
+    with the array, and a NumPy array is returned. Without NumPy, positions may
+    be any sequence of rows and a list is returned.
+    """
+    if numpy is None:
+        scores = [evaluate_cells(cells) for cells in positions]
+
+        if black_to_move is not None:
+            scores = [-score if black else score
+                      for score, black in zip(scores, black_to_move)]
+
+        return scores
+
+    positions = numpy.asarray(positions, dtype=numpy.intp)
+    scores = _SCORE_ARRAY[positions, numpy.arange(90)].sum(axis=1)
+
+    if black_to_move is not None:
+        scores = numpy.where(numpy.asarray(black_to_move, dtype=bool),
+                             -scores, scores)
+
+    return scores
@@ -3,456 +3,612 @@
 # Description: Defines a XiangqiGame class with a board with XiangqiPieces and
 # methods to move the pieces according to the rules of the game.
 
+import collections
+import logging
+import random
+import sys
+import threading
+
+# Debug tracing of check detection and move validation. Nothing is written
+# unless logging is configured to show DEBUG messages for this logger or a
+# tracer is set with XiangqiGame.set_tracer.
+_LOGGER = logging.getLogger(__name__)
+
+
+# Lookup tables for converting between positions, flat board indices, and
+# [x, y] coordinates, built once at import. Points are numbered from a1 (0) to
+# i10 (89) one rank at a time.
+_POSITIONS = tuple(letter + str(rank) for rank in range(1, 11)
+                   for letter in "abcdefghi")
+_POSITION_INDICES = {position: index for index, position in enumerate(
+    _POSITIONS)}
+_INDEX_COORDS = tuple((index % 9 + 1, index // 9 + 1) for index in range(90))
+_COORDS_INDICES = {coords: index for index, coords in enumerate(
+    _INDEX_COORDS)}
 
-def pos_coords(position):
-    """Returns a position on a XiangqiGame board as [x, y] coordinates."""
-    coords = []
-    x_coord = 1
-
-    # Iterates through the list of files on a Xiangqi game board and appends the
-    # numerical value of the given position's file to coords.
-    for letter in "abcdefghi":
-
-        if letter == position[0]:
-            coords.append(x_coord)
-
-        else:
-            x_coord += 1
-
-    # The rank is cast to int and appended since it's already numerical.
-    coords.append(int(position[1: len(position) + 1]))
 
-    return coords
+def pos_coords(position):
+    """
+    Returns a position on a XiangqiGame board as [x, y] coordinates. Raises
+    ValueError if the position is not on the board.
+    """
+    return list(_INDEX_COORDS[pos_index(position)])
 
 
 def coords_pos(coords):
     """
     Returns the Xiangqi board position corresponding to the given [x, y]
-    coordinates.
+    coordinates. Raises ValueError if the coordinates are not on the board.
     """
-    # Indexes into a string of all file labels to get file and concatenates with
-    # the y-coordinate cast as a string which is the same as the rank.
-    files = "abcdefghi"
-    return files[coords[0] - 1] + str(coords[1])
+    index = _COORDS_INDICES.get(tuple(coords))
 
+    if index is None:
+        raise ValueError("coordinates are not on the board: " + repr(coords))
 
-class XiangqiPiece:
+    return _POSITIONS[index]
+
+
+def pos_index(position):
     """
-    Creates a XiangqiPiece object of the given unit_type belonging to the given
-    player at the given position.
+    Returns the index of the given position on the flat 90-point board used by
+    XiangqiGame. Raises ValueError if the position is not on the board.
     """
-    def __init__(self, unit_type, player, position):
-        self._unit_type = unit_type
-        self._player = player
-        self._coords = pos_coords(position)
+    index = _POSITION_INDICES.get(position)
 
-    def get_unit_type(self):
-        """Returns the unit type of the XiangqiPiece."""
-        return self._unit_type
+    if index is None:
+        raise ValueError("position is not on the board: " + repr(position))
 
-    def get_player(self):
-        """Returns the color of the player who owns the XiangqiPiece."""
-        return self._player
+    return index
 
-    def get_coords(self):
-        """Returns the [x, y] coordinates of the XiangqiPiece"""
-        return self._coords
 
-    def set_coords(self, position):
-        """
-        Sets the [x, y] coordinates of the XiangqiPiece to the given position.
-        """
-        self._coords = pos_coords(position)
+def index_pos(index):
+    """Returns the position corresponding to the given flat board index."""
+    return _POSITIONS[index]
 
 
-class XQGeneral(XiangqiPiece):
-    """Creates a Xiangqi general piece."""
-    def __init__(self, unit_type, player, position):
-        super().__init__(unit_type, player, position)
+# Integer codes used to store XiangqiPieces on the flat board. The low three
+# bits hold the unit type and bit 3 is set for black pieces, so an empty point
+# is always 0 and a piece's owner can be found with code & BLACK.
+UNIT_CODES = {"general": 1,
+              "advisor": 2,
+              "elephant": 3,
+              "horse": 4,
+              "chariot": 5,
+              "cannon": 6,
+              "soldier": 7}
+RED = 0
+BLACK = 8
+PLAYER_CODES = {"red": RED, "black": BLACK}
 
-    # Each XiangqiPiece subclass contains a __repr__ method that represents the
-    # piece with the player who owns it followed by the unit type. Dashes are
-    # added on either side to facilitate clear printing of the board.
-    def __repr__(self):
+# The one shared name for each unit type (indexed by code & 7) and player
+# (indexed by code >> 3), so every XiangqiPiece refers to the same strings.
+_UNIT_NAMES = (None, "general", "advisor", "elephant", "horse", "chariot",
+               "cannon", "soldier")
+_PLAYER_NAMES = ("red", "black")
 
-        if self._player == "red":
-            return "-" + repr(self._player) + repr(self._unit_type) + "--"
 
-        if self._player == "black":
-            return repr(self._player) + repr(self._unit_type) + "-"
+def _on_board(file, rank):
+    """Returns True if the zero-based file and rank are on the board."""
+    return 0 <= file < 9 and 0 <= rank < 10
 
-    def get_moves(self, xiangqi_game):
-        """Returns a list of positions the piece can move to."""
-        move_list = []
 
-        if self._player == "red":
+def _in_palace(file, rank):
+    """Returns True if the zero-based file and rank are inside a palace."""
+    return 3 <= file <= 5 and (0 <= rank <= 2 or 7 <= rank <= 9)
 
-            # Checks against only the red player's palace since the general
-            # can't move outside those nine positions.
-            for point in ["d1", "d2", "d3",
-                          "e1", "e2", "e3",
-                          "f1", "f2", "f3"]:
 
-                # The next four code blocks (one for each orthogonal direction)
-                # check whether the position is orthogonal to the piece, then
-                # appends the position to the list of available moves if either
-                # the position is empty or it contains an enemy piece.
-                if False not in [pos_coords(point)[0] == self._coords[0],
-                                 pos_coords(point)[1] == self._coords[1] + 1]:
+# Move tables for the pieces that move a fixed distance, built once at import
+# and indexed by flat board index. Generating moves is then a walk over the
+# table entry for the piece's point with one occupancy test per destination.
+_ADVISOR_POINTS = {pos_index(point) for point in ["d1", "f1", "e2", "d3", "f3",
+                                                  "d8", "f8", "e9", "d10",
+                                                  "f10"]}
+_ELEPHANT_POINTS = {pos_index(point) for point in ["c1", "g1", "a3", "e3", "i3",
+                                                   "c5", "g5", "c6", "g6", "a8",
+                                                   "e8", "i8", "c10", "g10"]}
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
 
-                    elif xiangqi_game.get_board()[point].get_player() != "red":
-                        move_list.append(point)
+def _build_step_tables():
+    """
+    Returns the general, advisor, elephant, horse, and soldier move tables.
+    """
+    general_moves = []
+    advisor_moves = []
+    elephant_moves = []
+    horse_moves = []
+    soldier_moves = ([], [])
+
+    for square in range(90):
+        file, rank = square % 9, square // 9
+
+        # Generals step orthogonally and advisors diagonally, both without
+        # leaving the palace they start in.
+        general_moves.append(tuple(
+            (rank + d_rank) * 9 + file + d_file
+            for d_file, d_rank in [(0, 1), (1, 0), (0, -1), (-1, 0)]
+            if _in_palace(file, rank) and _in_palace(file + d_file,
+                                                     rank + d_rank)))
+
+        advisor_moves.append(tuple(
+            (rank + d_rank) * 9 + file + d_file
+            for d_file, d_rank in [(1, 1), (-1, 1), (1, -1), (-1, -1)]
+            if square in _ADVISOR_POINTS
+            and _on_board(file + d_file, rank + d_rank)
+            and (rank + d_rank) * 9 + file + d_file in _ADVISOR_POINTS))
+
+        # Elephant entries are (destination, eye) pairs. Elephants never cross
+        # the river, so the destination must be on the same side as the origin.
+        elephant_moves.append(tuple(
+            ((rank + d_rank) * 9 + file + d_file,
+             (rank + d_rank // 2) * 9 + file + d_file // 2)
+            for d_file, d_rank in [(2, 2), (-2, 2), (2, -2), (-2, -2)]
+            if square in _ELEPHANT_POINTS
+            and _on_board(file + d_file, rank + d_rank)
+            and (rank + d_rank) * 9 + file + d_file in _ELEPHANT_POINTS
+            and (rank <= 4) == (rank + d_rank <= 4)))
+
+        # Horse entries are (destination, leg) pairs, where the leg is the
+        # point orthogonally next to the horse that must be empty for the move.
+        horse_moves.append(tuple(
+            ((rank + d_rank) * 9 + file + d_file,
+             (rank + leg_rank) * 9 + file + leg_file)
+            for d_file, d_rank, leg_file, leg_rank in [(-2, -1, -1, 0),
+                                                       (-2, 1, -1, 0),
+                                                       (2, -1, 1, 0),
+                                                       (2, 1, 1, 0),
+                                                       (-1, 2, 0, 1),
+                                                       (1, 2, 0, 1),
+                                                       (-1, -2, 0, -1),
+                                                       (1, -2, 0, -1)]
+            if _on_board(file + d_file, rank + d_rank)))
+
+        # Soldiers step forward, and also sideways once they have crossed the
+        # river. The red table is indexed with 0 and the black table with 1.
+        for player, forward, crossed in [(0, 1, rank >= 5),
+                                         (1, -1, rank <= 4)]:
+            steps = [(0, forward)]
+
+            if crossed:
+                steps += [(1, 0), (-1, 0)]
+
+            soldier_moves[player].append(tuple(
+                (rank + d_rank) * 9 + file + d_file
+                for d_file, d_rank in steps
+                if _on_board(file + d_file, rank + d_rank)))
+
+    return (general_moves, advisor_moves, elephant_moves, horse_moves,
+            soldier_moves)
+
+
+(_GENERAL_MOVES, _ADVISOR_MOVES, _ELEPHANT_MOVES, _HORSE_MOVES,
+ _SOLDIER_MOVES) = _build_step_tables()
+
+
+def _slide_line(position, bits, length):
+    """
+    Returns chariot moves, cannon moves, and cannon captures as bit masks for a
+    piece at the given position on a line of the given length, where bits has
+    one set bit for every occupied point on the line.
+    """
+    chariot_moves = 0
+    cannon_moves = 0
+    cannon_captures = 0
 
-                if False not in [pos_coords(point)[1] == self._coords[1],
-                                 pos_coords(point)[0] == self._coords[0] + 1]:
+    for step in [1, -1]:
+        point = position + step
+        screen = False
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+        # Walks outward until the first piece (the chariot's last point and the
+        # cannon's screen), then on to the next piece (the cannon's capture).
+        while 0 <= point < length:
 
-                    elif xiangqi_game.get_board()[point].get_player() != "red":
-                        move_list.append(point)
+            if bits >> point & 1:
 
-                if False not in [pos_coords(point)[0] == self._coords[0],
-                                 pos_coords(point)[1] == self._coords[1] - 1]:
+                if screen:
+                    cannon_captures |= 1 << point
+                    break
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+                chariot_moves |= 1 << point
+                screen = True
 
-                    elif xiangqi_game.get_board()[point].get_player() != "red":
-                        move_list.append(point)
+            elif not screen:
+                chariot_moves |= 1 << point
+                cannon_moves |= 1 << point
 
-                if False not in [pos_coords(point)[1] == self._coords[1],
-                                 pos_coords(point)[0] == self._coords[0] - 1]:
+            point += step
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+    return chariot_moves, cannon_moves, cannon_captures
 
-                    elif xiangqi_game.get_board()[point].get_player() != "red":
-                        move_list.append(point)
 
-        if self._player == "black":
+def _build_slide_tables():
+    """
+    Returns the chariot and cannon lookup tables for ranks and files. Rank
+    tables are indexed by file and the rank's 9-bit occupancy and hold masks
+    for the first rank, which are shifted up to the piece's rank. File tables
+    are indexed by rank and the file's 10-bit occupancy and hold masks for the
+    first file, which are shifted across to the piece's file.
+    """
+    rank_tables = ([], [], [])
+    file_tables = ([], [], [])
 
-            # Checks against only the red player's palace since the general
-            # can't move outside those nine positions.
-            for point in ["d8", "d9", "d10",
-                          "e8", "e9", "e10",
-                          "f8", "f9", "f10"]:
-                if False not in [pos_coords(point)[0] == self._coords[0],
-                                 pos_coords(point)[1] == self._coords[1] + 1]:
+    for file in range(9):
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+        for table in rank_tables:
+            table.append([])
 
-                    elif xiangqi_game.get_board()[
-                             point].get_player() != "black":
-                        move_list.append(point)
+        for bits in range(512):
 
-                if False not in [pos_coords(point)[1] == self._coords[1],
-                                 pos_coords(point)[0] == self._coords[0] + 1]:
+            for table, mask in zip(rank_tables, _slide_line(file, bits, 9)):
+                table[file].append(mask)
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+    for rank in range(10):
 
-                    elif xiangqi_game.get_board()[
-                            point].get_player() != "black":
-                        move_list.append(point)
+        for table in file_tables:
+            table.append([])
 
-                if False not in [pos_coords(point)[0] == self._coords[0],
-                                 pos_coords(point)[1] == self._coords[1] - 1]:
+        for bits in range(1024):
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+            # Bit n of a file mask is the point on rank n + 1, which is bit
+            # n * 9 of a board mask.
+            for table, mask in zip(file_tables, _slide_line(rank, bits, 10)):
+                table[rank].append(sum(1 << point * 9 for point in range(10)
+                                       if mask >> point & 1))
 
-                    elif xiangqi_game.get_board()[
-                            point].get_player() != "black":
-                        move_list.append(point)
+    return rank_tables + file_tables
 
-                if False not in [pos_coords(point)[1] == self._coords[1],
-                                 pos_coords(point)[0] == self._coords[0] - 1]:
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+# Bitboards are Python ints with bit n set for flat board index n.
+(_RANK_CHARIOT_MOVES, _RANK_CANNON_MOVES, _RANK_CANNON_CAPTURES,
+ _FILE_CHARIOT_MOVES, _FILE_CANNON_MOVES,
+ _FILE_CANNON_CAPTURES) = _build_slide_tables()
 
-                    elif xiangqi_game.get_board()[
-                            point].get_player() != "black":
-                        move_list.append(point)
 
-        return move_list
+def _build_attacker_tables():
+    """
+    Returns the horse and soldier tables reversed, so each flat board index
+    maps to the points a horse or soldier could attack it from. Horse entries
+    are (origin, leg) pairs.
+    """
+    horse_attackers = [[] for square in range(90)]
+    soldier_attackers = ([[] for square in range(90)],
+                         [[] for square in range(90)])
 
+    for origin in range(90):
 
-class XQAdvisor(XiangqiPiece):
-    """Creates a Xiangqi advisor piece."""
+        for target, leg in _HORSE_MOVES[origin]:
+            horse_attackers[target].append((origin, leg))
 
-    def __init__(self, unit_type, player, position):
-        super().__init__(unit_type, player, position)
+        for player in [0, 1]:
 
-    def __repr__(self):
+            for target in _SOLDIER_MOVES[player][origin]:
+                soldier_attackers[player][target].append(origin)
 
-        if self._player == "red":
-            return "-" + repr(self._player) + repr(self._unit_type) + "--"
+    return ([tuple(entries) for entries in horse_attackers],
+            tuple([tuple(entries) for entries in table]
+                  for table in soldier_attackers))
 
-        if self._player == "black":
-            return repr(self._player) + repr(self._unit_type) + "-"
 
-    def get_moves(self, xiangqi_game):
-        """Returns a list of positions the piece can move to."""
-        # Same as the get_moves method in XQGeneral, but checks diagonally
-        # rather than orthogonally and only checks the five points Advisors can
-        # reach.
-        move_list = []
-
-        if self._player == "red":
+_HORSE_ATTACKERS, _SOLDIER_ATTACKERS = _build_attacker_tables()
 
-            for point in ["d1", "d3", "e2", "f1", "f3"]:
 
-                if False not in [pos_coords(point)[0] == self._coords[0] + 1,
-                                 pos_coords(point)[1] == self._coords[1] + 1]:
-
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+def _build_ray_tables():
+    """
+    Returns, for each flat board index, its four rays: tuples of the points
+    passed going up, down, right, and left from it to the edge of the board,
+    nearest first.
+    """
+    rays = []
 
-                    elif xiangqi_game.get_board()[point].get_player() != "red":
-                        move_list.append(point)
+    for square in range(90):
+        file, rank = square % 9, square // 9
+        square_rays = []
 
-                if False not in [pos_coords(point)[0] == self._coords[0] - 1,
-                                 pos_coords(point)[1] == self._coords[1] + 1]:
+        for d_file, d_rank in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+            ray = []
+            step_file, step_rank = file + d_file, rank + d_rank
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+            while _on_board(step_file, step_rank):
+                ray.append(step_rank * 9 + step_file)
+                step_file, step_rank = step_file + d_file, step_rank + d_rank
 
-                    elif xiangqi_game.get_board()[point].get_player() != "red":
-                        move_list.append(point)
+            square_rays.append(tuple(ray))
 
-                if False not in [pos_coords(point)[0] == self._coords[0] + 1,
-                                 pos_coords(point)[1] == self._coords[1] - 1]:
+        rays.append(tuple(square_rays))
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+    return rays
 
-                    elif xiangqi_game.get_board()[point].get_player() != "red":
-                        move_list.append(point)
 
-                if False not in [pos_coords(point)[0] == self._coords[0] - 1,
-                                 pos_coords(point)[1] == self._coords[1] - 1]:
+_RAYS = _build_ray_tables()
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
 
-                    elif xiangqi_game.get_board()[point].get_player() != "red":
-                        move_list.append(point)
+def _build_zobrist_keys():
+    """
+    Returns a table of random 64-bit keys indexed by piece code and flat board
+    index, plus the key used when black is to move. A fixed seed keeps hashes
+    the same across runs and processes.
+    """
+    generator = random.Random(0x58514721)
+    piece_keys = [[generator.getrandbits(64) for square in range(90)]
+                  for code in range(16)]
 
-        if self._player == "black":
+    return piece_keys, generator.getrandbits(64)
 
-            for point in ["d8", "d10", "e9", "f8", "f10"]:
 
-                if False not in [pos_coords(point)[0] == self._coords[0] + 1,
-                                 pos_coords(point)[1] == self._coords[1] + 1]:
+_ZOBRIST_KEYS, _ZOBRIST_BLACK_TURN = _build_zobrist_keys()
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
 
-                    elif xiangqi_game.get_board()[
-                            point].get_player() != "black":
-                        move_list.append(point)
+def _mask_squares(mask):
+    """Returns a list of the flat board indices set in the given bitboard."""
+    squares = []
 
-                if False not in [pos_coords(point)[0] == self._coords[0] - 1,
-                                 pos_coords(point)[1] == self._coords[1] + 1]:
+    while mask:
+        low_bit = mask & -mask
+        squares.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+    return squares
 
-                    elif xiangqi_game.get_board()[
-                            point].get_player() != "black":
-                        move_list.append(point)
 
-                if False not in [pos_coords(point)[0] == self._coords[0] + 1,
-                                 pos_coords(point)[1] == self._coords[1] - 1]:
+def _step_targets(cells, squares, own):
+    """
+    Returns the indices from squares that are empty or hold a piece that does
+    not belong to the player with the given colour code.
+    """
+    move_list = []
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
+    for square in squares:
 
-                    elif xiangqi_game.get_board()[
-                            point].get_player() != "black":
-                        move_list.append(point)
+        if not cells[square] or (cells[square] & BLACK) != own:
+            move_list.append(square)
 
-                if False not in [pos_coords(point)[0] == self._coords[0] - 1,
-                                 pos_coords(point)[1] == self._coords[1] - 1]:
+    return move_list
 
-                    if xiangqi_game.get_board()[point] == "-----------------":
-                        move_list.append(point)
 
-                    elif xiangqi_game.get_board()[
-                            point].get_player() != "black":
-                        move_list.append(point)
-        return move_list
+def _step_captures(cells, squares, own):
+    """
+    Returns the indices from squares that hold a piece that does not belong to
+    the player with the given colour code.
+    """
+    return [square for square in squares
+            if cells[square] and (cells[square] & BLACK) != own]
 
 
-class XQElephant(XiangqiPiece):
-    """Creates a Xiangqi elephant piece."""
+class MoveCache:
+    """
+    Creates a MoveCache object holding the legal moves of up to size
+    positions, keyed by a position's Zobrist hash and the player whose moves
+    they are. Once it is full, the least recently used position is dropped.
+    A lock guards every lookup and update, so games in several threads can
+    share one MoveCache.
+    """
+    def __init__(self, size=4096):
+        self._size = size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_size(self):
+        """Returns the number of positions the MoveCache can hold."""
+        return self._size
+
+    def get_hits(self):
+        """Returns the number of lookups that found their position."""
+        return self._hits
+
+    def get_misses(self):
+        """Returns the number of lookups that did not find their position."""
+        return self._misses
+
+    def clear(self):
+        """Removes every position from the MoveCache."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def get(self, key):
+        """
+        Returns the tuple of moves stored for the given (hash, player) key, or
+        None if there is none.
+        """
+        # Another thread could evict the entry between reading it and marking
+        # it as recently used, so both happen under the lock.
+        with self._lock:
+            moves = self._entries.get(key)
 
-    def __init__(self, unit_type, player, position):
-        super().__init__(unit_type, player, position)
+            if moves is None:
+                self._misses += 1
 
-    def __repr__(self):
-        if self._player == "red":
-            return "-" + repr(self._player) + repr(self._unit_type) + "-"
-        if self._player == "black":
-            return repr(self._player) + repr(self._unit_type)
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
 
-    def get_moves(self, xiangqi_game):
-        """Returns a list of positions the piece can move to."""
-        move_list = []
+        return moves
 
-        if self._player == "red":
+    def put(self, key, moves):
+        """Stores a tuple of moves for the given (hash, player) key."""
+        with self._lock:
+            self._entries[key] = moves
+            self._entries.move_to_end(key)
 
-            # Checks only the seven positions a red elephant can move to.
-            for point in ["c1", "g1", "a3", "e3", "i3", "c5", "g5"]:
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
 
-                # The following code blocks are the same as for XQAdvisor except
-                # the moves are checked two points diagonally instead of one and
-                # the mid-point is verified to be empty.
-                if False not in [pos_coords(point)[0] == self._coords[0] + 2,
-                                 pos_coords(point)[1] == self._coords[1] + 2]:
 
-                    # Finds the point between the origin and destination and
-                    # checks to make sure it is empty.
-                    mid_point = [self._coords[0] + 1, self._coords[1] + 1]
+# The MoveCache shared by every XiangqiGame unless it is given its own. Games
+# that reach the same position share its moves. Searches swap in a MoveCache of
+# their own, so the positions they visit do not push these out.
+_DEFAULT_MOVE_CACHE = MoveCache()
 
-                    if xiangqi_game.get_board()[
-                            coords_pos(mid_point)] == "-----------------":
 
-                        if xiangqi_game.get_board()[
-                                point] == "-----------------":
-                            move_list.append(point)
+class XiangqiPiece:
+    """
+    Creates a XiangqiPiece object of the given unit_type belonging to the given
+    player at the given position.
+    """
+    # Pieces have no instance dictionary. The unit type and player are the
+    # shared names from _UNIT_NAMES and _PLAYER_NAMES, the position is kept
+    # only as a flat board index, and the name is the piece's key in its
+    # player's pieces, or None until it is given one.
+    __slots__ = ("_unit_type", "_player", "_code", "_square", "_name")
 
-                        elif xiangqi_game.get_board()[
-                                point].get_player() != "red":
-                            move_list.append(point)
+    def __init__(self, unit_type, player, position):
+        self._code = UNIT_CODES[unit_type] | PLAYER_CODES[player]
+        self._unit_type = _UNIT_NAMES[self._code & 7]
+        self._player = _PLAYER_NAMES[self._code >> 3]
+        self._square = pos_index(position)
+        self._name = None
 
-                if False not in [pos_coords(point)[0] == self._coords[0] - 2,
-                                 pos_coords(point)[1] == self._coords[1] + 2]:
+    def get_unit_type(self):
+        """Returns the unit type of the XiangqiPiece."""
+        return self._unit_type
 
-                    mid_point = [self._coords[0] - 1, self._coords[1] + 1]
+    def get_player(self):
+        """Returns the color of the player who owns the XiangqiPiece."""
+        return self._player
 
-                    if xiangqi_game.get_board()[
-                            coords_pos(mid_point)] == "-----------------":
+    def get_code(self):
+        """Returns the integer code stored for the XiangqiPiece on the board."""
+        return self._code
 
-                        if xiangqi_game.get_board()[
-                                point] == "-----------------":
-                            move_list.append(point)
+    def get_name(self):
+        """
+        Returns the name the XiangqiPiece is stored under in its player's
+        pieces, e.g. "chariot_1".
+        """
+        return self._name
 
-                        elif xiangqi_game.get_board()[
-                                point].get_player() != "red":
-                            move_list.append(point)
+    def set_name(self, name):
+        """Sets the name the XiangqiPiece is stored under."""
+        self._name = name
 
-                if False not in [pos_coords(point)[0] == self._coords[0] + 2,
-                                 pos_coords(point)[1] == self._coords[1] - 2]:
+    def get_coords(self):
+        """Returns the [x, y] coordinates of the XiangqiPiece"""
+        return list(_INDEX_COORDS[self._square])
 
-                    mid_point = [self._coords[0] + 1, self._coords[1] - 1]
+    def get_square(self):
+        """Returns the flat board index of the XiangqiPiece."""
+        return self._square
 
-                    if xiangqi_game.get_board()[
-                            coords_pos(mid_point)] == "-----------------":
+    def set_coords(self, position):
+        """
+        Sets the [x, y] coordinates of the XiangqiPiece to the given position.
+        """
+        self._square = pos_index(position)
 
-                        if xiangqi_game.get_board()[
-                                point] == "-----------------":
-                            move_list.append(point)
+    def set_square(self, square):
+        """Sets the flat board index of the XiangqiPiece."""
+        self._square = square
 
-                        elif xiangqi_game.get_board()[
-                                point].get_player() != "red":
-                            move_list.append(point)
+    def get_moves(self, xiangqi_game):
+        """Returns a list of positions the piece can move to."""
+        return [_POSITIONS[square] for square in self.get_targets(
+            xiangqi_game)]
 
-                if False not in [pos_coords(point)[0] == self._coords[0] - 2,
-                                 pos_coords(point)[1] == self._coords[1] - 2]:
 
-                    mid_point = [self._coords[0] - 1, self._coords[1] - 1]
+class XQGeneral(XiangqiPiece):
+    """Creates a Xiangqi general piece."""
+    __slots__ = ()
 
-                    if xiangqi_game.get_board()[
-                            coords_pos(mid_point)] == "-----------------":
+    def __init__(self, unit_type, player, position):
+        super().__init__(unit_type, player, position)
 
-                        if xiangqi_game.get_board()[
-                                point] == "-----------------":
-                            move_list.append(point)
+    # Each XiangqiPiece subclass contains a __repr__ method that represents the
+    # piece with the player who owns it followed by the unit type. Dashes are
+    # added on either side to facilitate clear printing of the board.
+    def __repr__(self):
 
-                        elif xiangqi_game.get_board()[
-                                point].get_player() != "red":
-                            move_list.append(point)
+        if self._player == "red":
+            return "-" + repr(self._player) + repr(self._unit_type) + "--"
 
         if self._player == "black":
+            return repr(self._player) + repr(self._unit_type) + "-"
 
-            for point in ["c10", "g10", "a8", "e8", "i8", "c6", "g6"]:
-
-                if False not in [pos_coords(point)[0] == self._coords[0] + 2,
-                                 pos_coords(point)[1] == self._coords[1] + 2]:
+    def get_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can move to."""
+        return _step_targets(xiangqi_game.get_cells(),
+                             _GENERAL_MOVES[self._square],
+                             self._code & BLACK)
 
-                    mid_point = [self._coords[0] + 1, self._coords[1] + 1]
+    def get_capture_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can capture on."""
+        return _step_captures(xiangqi_game.get_cells(),
+                              _GENERAL_MOVES[self._square],
+                              self._code & BLACK)
 
-                    if xiangqi_game.get_board()[
-                            coords_pos(mid_point)] == "-----------------":
 
-                        if xiangqi_game.get_board()[
-                                point] == "-----------------":
-                            move_list.append(point)
+class XQAdvisor(XiangqiPiece):
+    """Creates a Xiangqi advisor piece."""
+    __slots__ = ()
 
-                        elif xiangqi_game.get_board()[
-                                point].get_player() != "black":
-                            move_list.append(point)
+    def __init__(self, unit_type, player, position):
+        super().__init__(unit_type, player, position)
 
-                if False not in [pos_coords(point)[0] == self._coords[0] - 2,
-                                 pos_coords(point)[1] == self._coords[1] + 2]:
+    def __repr__(self):
 
-                    mid_point = [self._coords[0] - 1, self._coords[1] + 1]
+        if self._player == "red":
+            return "-" + repr(self._player) + repr(self._unit_type) + "--"
 
-                    if xiangqi_game.get_board()[
-                            coords_pos(mid_point)] == "-----------------":
+        if self._player == "black":
+            return repr(self._player) + repr(self._unit_type) + "-"
 
-                        if xiangqi_game.get_board()[
-                                point] == "-----------------":
-                            move_list.append(point)
+    def get_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can move to."""
+        return _step_targets(xiangqi_game.get_cells(),
+                             _ADVISOR_MOVES[self._square],
+                             self._code & BLACK)
 
-                        elif xiangqi_game.get_board()[
-                                point].get_player() != "black":
-                            move_list.append(point)
+    def get_capture_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can capture on."""
+        return _step_captures(xiangqi_game.get_cells(),
+                              _ADVISOR_MOVES[self._square],
+                              self._code & BLACK)
 
-                if False not in [pos_coords(point)[0] == self._coords[0] + 2,
-                                 pos_coords(point)[1] == self._coords[1] - 2]:
 
-                    mid_point = [self._coords[0] + 1, self._coords[1] - 1]
+class XQElephant(XiangqiPiece):
+    """Creates a Xiangqi elephant piece."""
+    __slots__ = ()
 
-                    if xiangqi_game.get_board()[
-                            coords_pos(mid_point)] == "-----------------":
+    def __init__(self, unit_type, player, position):
+        super().__init__(unit_type, player, position)
 
-                        if xiangqi_game.get_board()[
-                                point] == "-----------------":
-                            move_list.append(point)
+    def __repr__(self):
+        if self._player == "red":
+            return "-" + repr(self._player) + repr(self._unit_type) + "-"
+        if self._player == "black":
+            return repr(self._player) + repr(self._unit_type)
 
-                        elif xiangqi_game.get_board()[
-                                point].get_player() != "black":
-                            move_list.append(point)
+    def get_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can move to."""
+        cells = xiangqi_game.get_cells()
+        own = self._code & BLACK
+        move_list = []
 
-                if False not in [pos_coords(point)[0] == self._coords[0] - 2,
-                                 pos_coords(point)[1] == self._coords[1] - 2]:
+        # Same as XQHorse, except the blocking point is the eye diagonally
+        # between the elephant and its destination.
+        for square, eye in _ELEPHANT_MOVES[self._square]:
 
-                    mid_point = [self._coords[0] - 1, self._coords[1] - 1]
+            if not cells[eye]:
 
-                    if xiangqi_game.get_board()[
-                            coords_pos(mid_point)] == "-----------------":
+                if not cells[square] or (cells[square] & BLACK) != own:
+                    move_list.append(square)
 
-                        if xiangqi_game.get_board()[
-                                point] == "-----------------":
-                            move_list.append(point)
+        return move_list
 
-                        elif xiangqi_game.get_board()[
-                                point].get_player() != "black":
-                            move_list.append(point)
+    def get_capture_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can capture on."""
+        cells = xiangqi_game.get_cells()
+        own = self._code & BLACK
 
-        return move_list
+        return [square for square, eye in _ELEPHANT_MOVES[self._square]
+                if not cells[eye] and cells[square]
+                and (cells[square] & BLACK) != own]
 
 
 class XQHorse(XiangqiPiece):
     """Creates a Xiangqi horse piece."""
+    __slots__ = ()
 
     def __init__(self, unit_type, player, position):
         super().__init__(unit_type, player, position)
@@ -463,167 +619,36 @@ class XQHorse(XiangqiPiece):
         if self._player == "black":
             return "-" + repr(self._player) + repr(self._unit_type) + "--"
 
-    def get_moves(self, xiangqi_game):
-        """Returns a list of positions the piece can move to."""
+    def get_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can move to."""
+        cells = xiangqi_game.get_cells()
+        own = self._code & BLACK
         move_list = []
 
-        # Checks whether a point two to the left is on the board.
-        if self._coords[0] - 2 > 0:
-
-            # Checks whether the point directly to the left is empty.
-            if xiangqi_game.get_board()[
-                coords_pos([self._coords[0] - 1, self._coords[
-                    1]])] == "-----------------":
-
-                # Checks whether a point down one is on the board.
-                if self._coords[1] - 1 > 0:
-
-                    # The following if/elif checks whether the target point (two
-                    # left and one down from the current position) is empty or
-                    # contains an enemy unit. In either case, the point is
-                    # appended to move_list.
-                    if xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] - 2, self._coords[
-                                1] - 1])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] - 2, self._coords[1] - 1]))
-
-                    elif xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] - 2, self._coords[
-                                1] - 1])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] - 2, self._coords[1] - 1]))
-
-                # Checks whether a point up one is on the board.
-                if self._coords[1] + 1 < 11:
-
-                    # The following if/elif checks whether the target point (two
-                    # left and one up of the current position) is empty or
-                    # contains an enemy unit. In either case, the point is
-                    # appended to move_list.
-                    if xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] - 2, self._coords[
-                                1] + 1])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] - 2, self._coords[1] + 1]))
-
-                    elif xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] - 2, self._coords[
-                                1] + 1])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] - 2, self._coords[1] + 1]))
-
-        # The following conditionals do the same as above, but in different
-        # directions. The first block checks right two and up and down one, the
-        # second block checks up two and left and right one, and the last block
-        # checks down two and left and right one.
-        if self._coords[0] + 2 < 10:
-
-            if xiangqi_game.get_board()[
-                coords_pos([self._coords[0] + 1, self._coords[
-                    1]])] == "-----------------":
-
-                if self._coords[1] - 1 > 0:
-
-                    if xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] + 2, self._coords[
-                                1] - 1])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] + 2, self._coords[1] - 1]))
-
-                    elif xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] + 2, self._coords[
-                                1] - 1])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] + 2, self._coords[1] - 1]))
-
-                if self._coords[1] + 1 < 11:
-
-                    if xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] + 2, self._coords[
-                                1] + 1])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] + 2, self._coords[1] + 1]))
-
-                    elif xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] + 2, self._coords[
-                                1] + 1])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] + 2, self._coords[1] + 1]))
-
-        if self._coords[1] + 2 < 11:
-
-            if xiangqi_game.get_board()[
-                coords_pos([self._coords[0], self._coords[
-                    1] + 1])] == "-----------------":
-
-                if self._coords[0] - 1 > 0:
-
-                    if xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] - 1, self._coords[
-                                1] + 2])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] - 1, self._coords[1] + 2]))
-
-                    elif xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] - 1, self._coords[
-                                1] + 2])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] - 1, self._coords[1] + 2]))
-
-                if self._coords[0] + 1 < 10:
-
-                    if xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] + 1, self._coords[
-                                1] + 2])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] + 1, self._coords[1] + 2]))
-
-                    elif xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] + 1, self._coords[
-                                1] + 2])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] + 1, self._coords[1] + 2]))
-
-        if self._coords[1] - 2 > 0:
-
-            if xiangqi_game.get_board()[
-                coords_pos([self._coords[0], self._coords[
-                    1] - 1])] == "-----------------":
-
-                if self._coords[0] - 1 > 0:
-
-                    if xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] - 1, self._coords[
-                                1] - 2])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] - 1, self._coords[1] - 2]))
-
-                    elif xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] - 1, self._coords[
-                                1] - 2])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] - 1, self._coords[1] - 2]))
-
-                if self._coords[0] + 1 < 10:
-
-                    if xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] + 1, self._coords[
-                                1] - 2])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] + 1, self._coords[1] - 2]))
-
-                    elif xiangqi_game.get_board()[
-                            coords_pos([self._coords[0] + 1, self._coords[
-                                1] - 2])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] + 1, self._coords[1] - 2]))
+        # A horse move is only possible when the point orthogonally next to the
+        # horse in the direction of the move (its leg) is empty.
+        for square, leg in _HORSE_MOVES[self._square]:
+
+            if not cells[leg]:
+
+                if not cells[square] or (cells[square] & BLACK) != own:
+                    move_list.append(square)
 
         return move_list
 
+    def get_capture_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can capture on."""
+        cells = xiangqi_game.get_cells()
+        own = self._code & BLACK
+
+        return [square for square, leg in _HORSE_MOVES[self._square]
+                if not cells[leg] and cells[square]
+                and (cells[square] & BLACK) != own]
+
 
 class XQChariot(XiangqiPiece):
     """Creates a Xiangqi chariot piece."""
+    __slots__ = ()
 
     def __init__(self, unit_type, player, position):
         super().__init__(unit_type, player, position)
@@ -634,187 +659,41 @@ class XQChariot(XiangqiPiece):
         if self._player == "black":
             return repr(self._player) + repr(self._unit_type) + "-"
 
-    def get_moves(self, xiangqi_game):
-        """Returns a list of positions the piece can move to."""
-        move_list = []
-
-        # Special case: XQChariot is in the first file.
-        if self._coords[0] == 1:
-
-            # Iterates through the x-coordinates for the second to ninth files.
-            for x_coord in range(2, 10):
-
-                # Each point on the same rank as XQChariot is checked in
-                # increasing order to determine whether each is empty.
-                if xiangqi_game.get_board()[coords_pos([
-                        x_coord, self._coords[1]])] != "-----------------":
-
-                    # If the point is NOT empty and the XiangqiPiece at that
-                    # point belongs to the current player, the point is not
-                    # added and the loop stops checking points along that rank.
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[
-                                1]])].get_player() == self._player:
-                        break
-
-                    # If the point is NOT empty and the XiangqiPiece at that
-                    # point belongs to the other player, the point is added to
-                    # move_list and the loop stops iterating through that rank.
-                    else:
-                        move_list.append(coords_pos([x_coord, self._coords[1]]))
-                        break
-
-                # If the point is empty, the point is added to move_list and the
-                # loop continues to iterate through the rank.
-                else:
-                    move_list.append(coords_pos([x_coord, self._coords[1]]))
-
-        # Special Case: XQ Chariot is in the last file.
-        elif self._coords[0] == 9:
-
-            # Everything is the same as above except the loop iterates through
-            # the eighth to first ranks in decreasing order.
-            for x_coord in range(8, 0, -1):
-
-                if xiangqi_game.get_board()[coords_pos([x_coord, self._coords[
-                        1]])] != "-----------------":
-
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[
-                                1]])].get_player() == self._player:
-                        break
-
-                    else:
-                        move_list.append(coords_pos([x_coord, self._coords[1]]))
-                        break
-
-                else:
-                    move_list.append(coords_pos([x_coord, self._coords[1]]))
-
-        # If the XQChariot is in any file except the first or last.
-        else:
-
-            # Iterates through the files from the XQChariot's current location
-            # (not including that file) to the first file in decreasing order.
-            for x_coord in range(self._coords[0] - 1, 0, -1):
-
-                if xiangqi_game.get_board()[coords_pos([x_coord, self._coords[
-                        1]])] != "-----------------":
-
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[
-                                1]])].get_player() == self._player:
-                        break
-
-                    else:
-                        move_list.append(coords_pos([x_coord, self._coords[1]]))
-                        break
-
-                else:
-                    move_list.append(coords_pos([x_coord, self._coords[1]]))
-
-            # Iterates through the files from the XQChariot's location
-            # (not including that file) to the last file in increasing order.
-            for x_coord in range(self._coords[0] + 1, 10):
-
-                if xiangqi_game.get_board()[coords_pos([x_coord, self._coords[
-                        1]])] != "-----------------":
-
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[
-                                1]])].get_player() == self._player:
-                        break
-
-                    else:
-                        move_list.append(coords_pos([x_coord, self._coords[1]]))
-                        break
-
-                else:
-                    move_list.append(coords_pos([x_coord, self._coords[1]]))
-
-        # The following code blocks do the same as above, except iterating
-        # through ranks within the XQChariot's file rather than through files
-        # within its rank.
-        # Special Case: The XQChariot is in the first rank.
-        if self._coords[1] == 1:
-
-            for y_coord in range(2, 11):
-
-                if xiangqi_game.get_board()[coords_pos([
-                        self._coords[0], y_coord])] != "-----------------":
-
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0], y_coord])].get_player() == self._player:
-                        break
-
-                    else:
-                        move_list.append(coords_pos([self._coords[0], y_coord]))
-                        break
-
-                else:
-                    move_list.append(coords_pos([self._coords[0], y_coord]))
-
-        # Special Case: The XQChariot is in the tenth rank.
-        elif self._coords[1] == 10:
-
-            for y_coord in range(9, 0, -1):
-
-                if xiangqi_game.get_board()[coords_pos([self._coords[
-                        0], y_coord])] != "-----------------":
-
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0], y_coord])].get_player() == self._player:
-                        break
-
-                    else:
-                        move_list.append(coords_pos([self._coords[0], y_coord]))
-                        break
-
-                else:
-                    move_list.append(coords_pos([self._coords[0], y_coord]))
-
-        # The XQChariot is in any rank except the first or tenth.
-        else:
-
-            for y_coord in range(self._coords[1] - 1, 0, -1):
-
-                if xiangqi_game.get_board()[coords_pos([self._coords[
-                        0], y_coord])] != "-----------------":
-
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0], y_coord])].get_player() == self._player:
-                        break
-
-                    else:
-                        move_list.append(coords_pos([self._coords[0], y_coord]))
-                        break
-
-                else:
-                    move_list.append(coords_pos([self._coords[0], y_coord]))
-
-            for y_coord in range(self._coords[1] + 1, 11):
+    def get_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can move to."""
+        bitboards = xiangqi_game.get_bitboards()
+        occupied = bitboards[0] | bitboards[1]
+        rank, file = divmod(self._square, 9)
+        rank_bits = (occupied >> rank * 9) & 511
+        file_bits = xiangqi_game.get_file_occupancy()[file]
 
-                if xiangqi_game.get_board()[coords_pos([self._coords[
-                        0], y_coord])] != "-----------------":
+        # The rank and file lookups give every point up to and including the
+        # first piece in each direction. Points holding the chariot's own
+        # pieces are then masked out.
+        attacks = (_RANK_CHARIOT_MOVES[file][rank_bits] << rank * 9
+                   | _FILE_CHARIOT_MOVES[rank][file_bits] << file)
 
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0], y_coord])].get_player() == self._player:
-                        break
+        return _mask_squares(attacks & ~bitboards[self._code >> 3])
 
-                    else:
-                        move_list.append(coords_pos([self._coords[0], y_coord]))
-                        break
+    def get_capture_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can capture on."""
+        bitboards = xiangqi_game.get_bitboards()
+        occupied = bitboards[0] | bitboards[1]
+        rank, file = divmod(self._square, 9)
+        rank_bits = (occupied >> rank * 9) & 511
+        file_bits = xiangqi_game.get_file_occupancy()[file]
 
-                else:
-                    move_list.append(coords_pos([self._coords[0], y_coord]))
+        # Only the first piece reached in each direction can be captured, so
+        # the lookups are kept where they end on an opposing piece.
+        attacks = (_RANK_CHARIOT_MOVES[file][rank_bits] << rank * 9
+                   | _FILE_CHARIOT_MOVES[rank][file_bits] << file)
 
-        # After all points the XQChariot can move to are added to move_list, the
-        # list is returned.
-        return move_list
+        return _mask_squares(attacks & bitboards[1 - (self._code >> 3)])
 
 
 class XQCannon(XiangqiPiece):
     """Creates a Xiangqi cannon piece."""
+    __slots__ = ()
 
     def __init__(self, unit_type, player, position):
         super().__init__(unit_type, player, position)
@@ -825,533 +704,407 @@ class XQCannon(XiangqiPiece):
         if self._player == "black":
             return "-" + repr(self._player) + repr(self._unit_type) + "-"
 
-    def get_moves(self, xiangqi_game):
-        """Returns a list of positions the piece can move to."""
-        move_list = []
-
-        # Special case: XQCannon is in the first file.
-        if self._coords[0] == 1:
-
-            jumps = 0
-
-            # Iterates through the x-coordinates for the second to ninth files.
-            for x_coord in range(2, 10):
-
-                # If the XQCannon has jumped a XiangqiPiece.
-                if jumps == 1:
-
-                    # If the position is not empty...
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[1]])] != "-----------------":
-
-                        # If the position contains a XiangqiPiece belonging to
-                        # the current player, the iteration is ended and nothing
-                        # more is added to move_list in this direction.
-                        if xiangqi_game.get_board()[coords_pos([
-                                x_coord, self._coords[
-                                    1]])].get_player() == self._player:
-                            break
-
-                        # If the position contains an opponent XiangqiPiece, the
-                        # position is added to move_list and the iteration is
-                        # ended.
-                        else:
-                            move_list.append(coords_pos([
-                                x_coord, self._coords[1]]))
-                            break
-
-                # If the XQCannon has not jumped another XiangqiPiece.
-                if jumps == 0:
-
-                    # If the position is empty, it is added to move_list.
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[1]])] == "-----------------":
-                        move_list.append(coords_pos([x_coord, self._coords[1]]))
-
-                    # If the position is not empty, jumps is set to 1.
-                    else:
-                        jumps = 1
-
-        # Special Case: XQCannon is in the last file.
-        elif self._coords[0] == 9:
-
-            jumps = 0
-
-            # Everything is the same as above except the loop iterates through
-            # the eighth to first ranks in decreasing order.
-            for x_coord in range(8, 0, -1):
+    def get_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can move to."""
+        bitboards = xiangqi_game.get_bitboards()
+        occupied = bitboards[0] | bitboards[1]
+        rank, file = divmod(self._square, 9)
+        rank_bits = (occupied >> rank * 9) & 511
+        file_bits = xiangqi_game.get_file_occupancy()[file]
 
-                if jumps == 1:
+        # Without capturing, the cannon moves like a chariot onto empty points.
+        # It captures the first piece beyond exactly one screen, which is only
+        # kept if that piece belongs to the opponent.
+        moves = (_RANK_CANNON_MOVES[file][rank_bits] << rank * 9
+                 | _FILE_CANNON_MOVES[rank][file_bits] << file)
+        captures = (_RANK_CANNON_CAPTURES[file][rank_bits] << rank * 9
+                    | _FILE_CANNON_CAPTURES[rank][file_bits] << file)
 
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[1]])] != "-----------------":
+        return _mask_squares(moves | (captures & bitboards[
+            1 - (self._code >> 3)]))
 
-                        if xiangqi_game.get_board()[coords_pos([
-                                x_coord, self._coords[
-                                    1]])].get_player() == self._player:
-                            break
+    def get_capture_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can capture on."""
+        bitboards = xiangqi_game.get_bitboards()
+        occupied = bitboards[0] | bitboards[1]
+        rank, file = divmod(self._square, 9)
+        rank_bits = (occupied >> rank * 9) & 511
+        file_bits = xiangqi_game.get_file_occupancy()[file]
 
-                        else:
-                            move_list.append(coords_pos([
-                                x_coord, self._coords[1]]))
-                            break
+        # Only the jumps over a screen are needed, without the sliding moves.
+        captures = (_RANK_CANNON_CAPTURES[file][rank_bits] << rank * 9
+                    | _FILE_CANNON_CAPTURES[rank][file_bits] << file)
 
-                if jumps == 0:
-
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[1]])] == "-----------------":
-                        move_list.append(coords_pos([x_coord, self._coords[1]]))
-
-                    else:
-                        jumps = 1
-
-        # If the XQCannon is in any file except the first or last.
-        else:
-
-            jumps = 0
-
-            # Iterates through the files from the XQCannon's current location
-            # (not including that file) to the first file in decreasing order.
-            for x_coord in range(self._coords[0] - 1, 0, -1):
-
-                if jumps == 1:
-
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[1]])] != "-----------------":
-
-                        if xiangqi_game.get_board()[coords_pos([
-                                x_coord, self._coords[
-                                    1]])].get_player() == self._player:
-                            break
-
-                        else:
-                            move_list.append(coords_pos([
-                                x_coord, self._coords[1]]))
-                            break
-
-                if jumps == 0:
-
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[1]])] == "-----------------":
-                        move_list.append(coords_pos([x_coord, self._coords[1]]))
-
-                    else:
-                        jumps = 1
+        return _mask_squares(captures & bitboards[1 - (self._code >> 3)])
 
-            jumps = 0
 
-            # Iterates through the files from the XQCannon's location
-            # (not including that file) to the last file in increasing order.
-            for x_coord in range(self._coords[0] + 1, 10):
-
-                if jumps == 1:
+class XQSoldier(XiangqiPiece):
+    """Creates a Xiangqi soldier piece."""
+    __slots__ = ()
 
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[1]])] != "-----------------":
+    def __init__(self, unit_type, player, position):
+        super().__init__(unit_type, player, position)
 
-                        if xiangqi_game.get_board()[coords_pos([
-                                x_coord, self._coords[
-                                    1]])].get_player() == self._player:
-                            break
+    def __repr__(self):
+        if self._player == "red":
+            return "-" + repr(self._player) + repr(self._unit_type) + "--"
+        if self._player == "black":
+            return repr(self._player) + repr(self._unit_type) + "-"
 
-                        else:
-                            move_list.append(coords_pos([
-                                x_coord, self._coords[1]]))
-                            break
+    def get_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can move to."""
+        # The table for the piece's owner already only includes sideways steps
+        # once the river has been crossed.
+        return _step_targets(xiangqi_game.get_cells(),
+                             _SOLDIER_MOVES[self._code >> 3][self._square],
+                             self._code & BLACK)
+
+    def get_capture_targets(self, xiangqi_game):
+        """Returns a list of flat board indices the piece can capture on."""
+        return _step_captures(xiangqi_game.get_cells(),
+                              _SOLDIER_MOVES[self._code >> 3][self._square],
+                              self._code & BLACK)
+
+
+# Classes and FEN letters for each unit type. Elephants and horses are also
+# read as "e" and "h", which some FEN writers use.
+_PIECE_CLASSES = {"general": XQGeneral,
+                  "advisor": XQAdvisor,
+                  "elephant": XQElephant,
+                  "horse": XQHorse,
+                  "chariot": XQChariot,
+                  "cannon": XQCannon,
+                  "soldier": XQSoldier}
+_FEN_UNITS = {"k": "general",
+              "a": "advisor",
+              "b": "elephant",
+              "e": "elephant",
+              "n": "horse",
+              "h": "horse",
+              "r": "chariot",
+              "c": "cannon",
+              "p": "soldier"}
+
+# FEN letter for each piece code, uppercase for red.
+_CODE_LETTERS = " KABNRCP" + " kabnrcp"
+
+START_FEN = ("rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR"
+             " w - - 0 1")
+
+
+def cells_to_fen(cells, turn="red"):
+    """
+    Returns a FEN string for the position in the given sequence of 90 piece
+    codes with the given player to move.
+    """
+    ranks = []
 
-                if jumps == 0:
+    for rank in range(9, -1, -1):
+        letters = ""
+        empty = 0
 
-                    if xiangqi_game.get_board()[coords_pos([
-                            x_coord, self._coords[1]])] == "-----------------":
-                        move_list.append(coords_pos([x_coord, self._coords[1]]))
+        for code in cells[rank * 9: rank * 9 + 9]:
 
-                    else:
-                        jumps = 1
+            if code:
 
-        # The following code blocks do the same as above, except iterating
-        # through ranks within the XQCannon's file rather than through files
-        # within its rank.
-        # Special Case: The XQCannon is in the first rank.
-        if self._coords[1] == 1:
+                if empty:
+                    letters += str(empty)
+                    empty = 0
 
-            jumps = 0
+                letters += _CODE_LETTERS[code]
 
-            for y_coord in range(2, 11):
+            else:
+                empty += 1
 
-                if jumps == 1:
+        if empty:
+            letters += str(empty)
 
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0], y_coord])] != "-----------------":
+        ranks.append(letters)
 
-                        if xiangqi_game.get_board()[coords_pos([self._coords[
-                                0], y_coord])].get_player() == self._player:
-                            break
+    return "/".join(ranks) + " " + ("w" if turn == "red" else "b") + " - - 0 1"
 
-                        else:
-                            move_list.append(coords_pos([
-                                self._coords[0], y_coord]))
-                            break
 
-                if jumps == 0:
+class XiangqiGame:
+    """
+    Creates a XiangqiGame object with a _board (which contains the
+    XiangqiPieces), _game_state, _check_red, _check_black, _turn, _red_pieces,
+    and _black_pieces. Contains methods for moving the XiangqiPieces over the
+    board according to the rules of the game.
+    """
+    # Games have no instance dictionary, which keeps many live games small.
+    __slots__ = ("_tracer", "_game_state", "_check_red", "_check_black",
+                 "_checked_from", "_turn", "_history", "_hash", "_board",
+                 "_cells", "_bitboards", "_file_occupancy", "_red_pieces",
+                 "_black_pieces", "_generals", "_move_cache")
 
-                    if xiangqi_game.get_board()[coords_pos([
-                            self._coords[0], y_coord])] == "-----------------":
-                        move_list.append(coords_pos([self._coords[0], y_coord]))
+    def __init__(self, fen=None):
+        # Optional function called with each trace message.
+        self._tracer = None
 
-                    else:
-                        jumps = 1
+        # Where legal move lists are cached, or None if they are not.
+        self._move_cache = _DEFAULT_MOVE_CACHE
 
-        # Special Case: The XQCannon is in the tenth rank.
-        elif self._coords[1] == 10:
+        # The position is set up from the given FEN string, or the opening
+        # position if there is none.
+        if fen is None:
+            fen = START_FEN
 
-            jumps = 0
+        self._setup(fen)
 
-            for y_coord in range(9, 0, -1):
+    @classmethod
+    def from_fen(cls, fen):
+        """Returns a new XiangqiGame set up from the given FEN string."""
+        return cls(fen)
 
-                if jumps == 1:
+    def reset(self, fen=None):
+        """
+        Sets the XiangqiGame back to the opening position, or to the position
+        in the given FEN string, so the object can be reused for another game.
+        The tracer is kept.
+        """
+        if fen is None:
+            fen = START_FEN
 
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0], y_coord])] != "-----------------":
+        self._setup(fen)
 
-                        if xiangqi_game.get_board()[coords_pos([self._coords[
-                                0], y_coord])].get_player() == self._player:
-                            break
+    def _setup(self, fen):
+        """
+        Sets up the XiangqiGame from a FEN string in a single pass over its
+        ranks, replacing the position, pieces, turn, and move history. Ranks are
+        listed from 10 down to 1 and separated by slashes. Each rank lists its
+        points from a to i, with digits counting empty points, uppercase letters
+        for red pieces, and lowercase letters for black pieces. The second field
+        is "w" or "r" if red is to move, or "b" if black is. Any later fields
+        are ignored. Raises ValueError if the FEN string is invalid.
+        """
+        fields = fen.split()
+        ranks = fields[0].split("/") if fields else []
 
-                        else:
-                            move_list.append(coords_pos([
-                                self._coords[0], y_coord]))
-                            break
+        if len(ranks) != 10:
+            raise ValueError("FEN must have 10 ranks: " + repr(fen))
 
-                if jumps == 0:
+        if len(fields) > 1 and fields[1] not in ["w", "r", "b"]:
+            raise ValueError("FEN side to move must be w, r, or b: "
+                             + repr(fen))
 
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                                        0], y_coord])] == "-----------------":
-                        move_list.append(coords_pos([self._coords[0], y_coord]))
+        self._game_state = "UNFINISHED"
+        self._check_red = False
+        self._check_black = False
+        self._checked_from = None
+        self._turn = "red"
 
-                    else:
-                        jumps = 1
+        # Undo records for the moves made with push, most recent last.
+        self._history = []
+
+        # Zobrist hash of the position, updated whenever a point changes or the
+        # turn passes.
+        self._hash = 0
+
+        # Every position starts out empty, with a value of "-----------------"
+        # to facilitate clear printing of the board. The same position is kept
+        # in a flat array of 90 piece codes indexed by pos_index. The
+        # dictionary is what get_board returns, while the array is what the
+        # rules read when they only need occupancy.
+        self._board = dict.fromkeys(_POSITIONS, "-----------------")
+        self._cells = bytearray(90)
+
+        # Occupancy is also kept as one bitboard per player (red first) and as
+        # a 10-bit mask of occupied ranks for each file, which the chariot and
+        # cannon move tables are indexed by.
+        self._bitboards = [0, 0]
+        self._file_occupancy = [0] * 9
+
+        # Each player's pieces are stored in a dictionary. The general is named
+        # "general" and other pieces are numbered by type in the order they
+        # appear in the FEN string, e.g. "chariot_1". Each piece also keeps its
+        # own name, so a captured piece is removed without a search, and the
+        # generals are kept by player (red first). Names are interned so every
+        # game shares one copy of each.
+        self._red_pieces = {}
+        self._black_pieces = {}
+        counts = {}
+
+        for rank_number, rank in zip(range(10, 0, -1), ranks):
+            file = 0
+
+            for letter in rank:
+
+                if letter.isdigit():
+                    file += int(letter)
+                    continue
+
+                if letter.lower() not in _FEN_UNITS or file > 8:
+                    raise ValueError("invalid FEN rank " + repr(rank))
+
+                unit_type = _FEN_UNITS[letter.lower()]
+                player = "red" if letter.isupper() else "black"
+                position = "abcdefghi"[file] + str(rank_number)
+                piece = _PIECE_CLASSES[unit_type](unit_type, player, position)
+
+                if player == "red":
+                    pieces = self._red_pieces
 
-        # The XQCannon is in any rank except the first or tenth.
-        else:
+                else:
+                    pieces = self._black_pieces
 
-            jumps = 0
+                if unit_type == "general":
+                    name = "general"
 
-            for y_coord in range(self._coords[1] - 1, 0, -1):
+                    if name in pieces:
+                        raise ValueError("FEN has two " + player + " generals")
 
-                if jumps == 1:
+                else:
+                    counts[letter.isupper(), unit_type] = counts.get(
+                        (letter.isupper(), unit_type), 0) + 1
+                    name = sys.intern(unit_type + "_" + str(
+                        counts[letter.isupper(), unit_type]))
 
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0], y_coord])] != "-----------------":
+                pieces[name] = piece
+                piece.set_name(name)
+                self._set_point(pos_index(position), piece)
+                file += 1
 
-                        if xiangqi_game.get_board()[coords_pos([self._coords[
-                                0], y_coord])].get_player() == self._player:
-                            break
+            if file != 9:
+                raise ValueError("FEN rank must have 9 points: " + repr(rank))
 
-                        else:
-                            move_list.append(coords_pos([
-                                self._coords[0], y_coord]))
-                            break
+        if ("general" not in self._red_pieces
+                or "general" not in self._black_pieces):
+            raise ValueError("FEN must have a general for each player")
 
-                if jumps == 0:
+        self._generals = [self._red_pieces["general"],
+                          self._black_pieces["general"]]
 
-                    if xiangqi_game.get_board()[coords_pos([
-                            self._coords[0], y_coord])] == "-----------------":
-                        move_list.append(coords_pos([self._coords[0], y_coord]))
+        if len(fields) > 1 and fields[1] == "b":
+            self._turn = "black"
+            self._hash ^= _ZOBRIST_BLACK_TURN
 
-                    else:
-                        jumps = 1
+        # A position may start with the player to move in check, or even
+        # checkmated.
+        if self.is_general_attacked(self._turn):
 
-            jumps = 0
+            if self._turn == "red":
+                self._check_red = True
 
-            for y_coord in range(self._coords[1] + 1, 11):
+            else:
+                self._check_black = True
 
-                if jumps == 1:
+            if self.is_checkmate(self._turn):
 
-                    if xiangqi_game.get_board()[coords_pos([
-                            self._coords[0], y_coord])] != "-----------------":
+                if self._turn == "red":
+                    self._game_state = "BLACK_WON"
 
-                        if xiangqi_game.get_board()[coords_pos([self._coords[
-                                0], y_coord])].get_player() == self._player:
-                            break
+                else:
+                    self._game_state = "RED_WON"
 
-                        else:
-                            move_list.append(coords_pos([
-                                self._coords[0], y_coord]))
-                            break
+    def to_fen(self):
+        """
+        Returns a FEN string for the position, in the form read by from_fen.
+        """
+        return cells_to_fen(self._cells, self._turn)
 
-                if jumps == 0:
+    def set_game_state(self, state):
+        """Updates the _game_state to the given state."""
+        self._game_state = state
 
-                    if xiangqi_game.get_board()[coords_pos([
-                            self._coords[0], y_coord])] == "-----------------":
-                        move_list.append(coords_pos([self._coords[0], y_coord]))
+    def get_game_state(self):
+        """Returns the _game_state."""
+        return self._game_state
 
-                    else:
-                        jumps = 1
+    def get_turn(self):
+        """Returns the player whose turn it is."""
+        return self._turn
 
-        return move_list
+    def get_board(self):
+        """Returns the game board."""
+        return self._board
 
+    def set_tracer(self, tracer):
+        """
+        Sets a function to be called with a message whenever the game traces
+        check detection or move validation, or None to stop tracing.
+        """
+        self._tracer = tracer
 
-class XQSoldier(XiangqiPiece):
-    """Creates a Xiangqi soldier piece."""
+    def get_move_cache(self):
+        """Returns the MoveCache used by legal_moves, or None if none is."""
+        return self._move_cache
 
-    def __init__(self, unit_type, player, position):
-        super().__init__(unit_type, player, position)
+    def set_move_cache(self, move_cache):
+        """
+        Sets the MoveCache used by legal_moves, or None to generate the moves
+        every time.
+        """
+        self._move_cache = move_cache
 
-    def __repr__(self):
-        if self._player == "red":
-            return "-" + repr(self._player) + repr(self._unit_type) + "--"
-        if self._player == "black":
-            return repr(self._player) + repr(self._unit_type) + "-"
+    def _trace(self, message, *args):
+        """
+        Sends a trace message to the tracer and the module logger, if either
+        wants it. Callers should check _is_tracing first so the message is not
+        built when nobody is listening.
+        """
+        if self._tracer is not None:
+            self._tracer(message % args)
 
-    def get_moves(self, xiangqi_game):
-        """Returns a list of positions the piece can move to."""
-        move_list = []
+        _LOGGER.debug(message, *args)
 
-        if self._player == "red":
+    def _is_tracing(self):
+        """Returns True if trace messages would go anywhere."""
+        return self._tracer is not None or _LOGGER.isEnabledFor(logging.DEBUG)
 
-            # If the XQSoldier has not reached the other end of the board, it
-            # can move forward one point.
-            if self._coords[1] < 10:
-
-                # If the point directly ahead of the XQSoldier is blank, it is
-                # added to move_list.
-                if xiangqi_game.get_board()[coords_pos([self._coords[
-                        0], self._coords[1] + 1])] == "-----------------":
-                    move_list.append(coords_pos([
-                        self._coords[0], self._coords[1] + 1]))
-
-                # If the point directly ahead of the XQSoldier contains an enemy
-                # XiangqiPiece, the position is added to move_list.
-                elif xiangqi_game.get_board()[coords_pos([self._coords[
-                        0], self._coords[1] + 1])].get_player() != self._player:
-                    move_list.append(coords_pos([
-                        self._coords[0], self._coords[1] + 1]))
-
-            # If the XQSoldier has crossed the river, it can move one point
-            # along ranks.
-            if self._coords[1] >= 6:
-
-                if self._coords[0] < 9:
-
-                    # If the point directly right of the XQSoldier is blank, it
-                    # is added to move_list.
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0] + 1, self._coords[1]])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] + 1, self._coords[1]]))
-
-                    # If the point directly right of the XQSoldier contains an
-                    # enemy XiangqiPiece, the position is added to move_list.
-                    elif xiangqi_game.get_board()[coords_pos([self._coords[
-                            0] + 1, self._coords[
-                                1]])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] + 1, self._coords[1]]))
-
-                if self._coords[0] > 1:
-
-                    # If the point directly left of the XQSoldier is blank, it
-                    # is added to move_list.
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0] - 1, self._coords[1]])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] - 1, self._coords[1]]))
-
-                    # If the point directly right of the XQSoldier contains an
-                    # enemy XiangqiPiece, the position is added to move_list.
-                    elif xiangqi_game.get_board()[coords_pos([self._coords[
-                            0] - 1, self._coords[
-                                1]])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] - 1, self._coords[1]]))
+    def get_hash(self):
+        """
+        Returns the Zobrist hash of the position, covering the placement of all
+        XiangqiPieces and which player is to move.
+        """
+        return self._hash
 
-        if self._player == "black":
+    def get_piece_at(self, square):
+        """
+        Returns the XiangqiPiece at the given flat board index, or the empty
+        marker "-----------------" if there is none.
+        """
+        return self._board[_POSITIONS[square]]
 
-            # If the XQSoldier has not reached the other end of the board, it
-            # can move forward one point.
-            if self._coords[1] > 1:
-
-                # If the point directly ahead of the XQSoldier is blank, it is
-                # added to move_list.
-                if xiangqi_game.get_board()[coords_pos([self._coords[
-                        0], self._coords[1] - 1])] == "-----------------":
-                    move_list.append(coords_pos([
-                        self._coords[0], self._coords[1] - 1]))
-
-                # If the point directly ahead of the XQSoldier contains an enemy
-                # XiangqiPiece, the position is added to move_list.
-                elif xiangqi_game.get_board()[coords_pos([self._coords[
-                        0], self._coords[1] - 1])].get_player() != self._player:
-                    move_list.append(coords_pos([
-                        self._coords[0], self._coords[1] - 1]))
-
-            # If the XQSoldier has crossed the river, it can move one point
-            # along ranks.
-            if self._coords[1] <= 5:
-
-                if self._coords[0] < 9:
-
-                    # If the point directly right of the XQSoldier is blank, it
-                    # is added to move_list.
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0] + 1, self._coords[1]])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] + 1, self._coords[1]]))
-
-                    # If the point directly right of the XQSoldier contains an
-                    # enemy XiangqiPiece, the position is added to move_list.
-                    elif xiangqi_game.get_board()[coords_pos([self._coords[
-                            0] + 1, self._coords[
-                                1]])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] + 1, self._coords[1]]))
-
-                if self._coords[0] > 1:
-
-                    # If the point directly left of the XQSoldier is blank, it
-                    # is added to move_list.
-                    if xiangqi_game.get_board()[coords_pos([self._coords[
-                            0] - 1, self._coords[1]])] == "-----------------":
-                        move_list.append(coords_pos([
-                            self._coords[0] - 1, self._coords[1]]))
-
-                    # If the point directly right of the XQSoldier contains an
-                    # enemy XiangqiPiece, the position is added to move_list.
-                    elif xiangqi_game.get_board()[coords_pos([self._coords[
-                            0] - 1, self._coords[
-                                1]])].get_player() != self._player:
-                        move_list.append(coords_pos([
-                            self._coords[0] - 1, self._coords[1]]))
+    def get_general_square(self, player):
+        """Returns the flat board index of the given player's general."""
+        return self._generals[PLAYER_CODES[player] >> 3].get_square()
 
-        return move_list
+    def get_cells(self):
+        """Returns the flat array of piece codes backing the game board."""
+        return self._cells
 
+    def get_bitboards(self):
+        """Returns the red and black occupancy bitboards."""
+        return self._bitboards
 
-class XiangqiGame:
-    """
-    Creates a XiangqiGame object with a _board (which contains the
-    XiangqiPieces), _game_state, _check_red, _check_black, _turn, _red_pieces,
-    and _black_pieces. Contains methods for moving the XiangqiPieces over the
-    board according to the rules of the game.
-    """
-    def __init__(self):
-        self._game_state = "UNFINISHED"
-        self._check_red = False
-        self._check_black = False
-        self._checked_from = None
-        self._turn = "red"
+    def get_file_occupancy(self):
+        """Returns the occupied ranks of each file as a list of bit masks."""
+        return self._file_occupancy
 
-        # XiangqiPieces are created and added to the board at their appropriate
-        # positions. Empty positions are initialized with a value of
-        # "-----------------" to facilitate clear printing of the board.
-        self._board = {"a1": XQChariot("chariot", "red", "a1"),
-                       "a2": "-----------------", "a3": "-----------------",
-                       "a4": XQSoldier("soldier", "red", "a4"),
-                       "a5": "-----------------", "a6": "-----------------",
-                       "a7": XQSoldier("soldier", "black", "a7"),
-                       "a8": "-----------------", "a9": "-----------------",
-                       "a10": XQChariot("chariot", "black", "a10"),
-                       "b1": XQHorse("horse", "red", "b1"),
-                       "b2": "-----------------",
-                       "b3": XQCannon("cannon", "red", "b3"),
-                       "b4": "-----------------", "b5": "-----------------",
-                       "b6": "-----------------", "b7": "-----------------",
-                       "b8": XQCannon("cannon", "black", "b8"),
-                       "b9": "-----------------",
-                       "b10": XQHorse("horse", "black", "b10"),
-                       "c1": XQElephant("elephant", "red", "c1"),
-                       "c2": "-----------------", "c3": "-----------------",
-                       "c4": XQSoldier("soldier", "red", "c4"),
-                       "c5": "-----------------", "c6": "-----------------",
-                       "c7": XQSoldier("soldier", "black", "c7"),
-                       "c8": "-----------------", "c9": "-----------------",
-                       "c10": XQElephant("elephant", "black", "c10"),
-                       "d1": XQAdvisor("advisor", "red", "d1"),
-                       "d2": "-----------------", "d3": "-----------------",
-                       "d4": "-----------------", "d5": "-----------------",
-                       "d6": "-----------------", "d7": "-----------------",
-                       "d8": "-----------------", "d9": "-----------------",
-                       "d10": XQAdvisor("advisor", "black", "d10"),
-                       "e1": XQGeneral("general", "red", "e1"),
-                       "e2": "-----------------", "e3": "-----------------",
-                       "e4": XQSoldier("soldier", "red", "e4"),
-                       "e5": "-----------------", "e6": "-----------------",
-                       "e7": XQSoldier("soldier", "black", "e7"),
-                       "e8": "-----------------", "e9": "-----------------",
-                       "e10": XQGeneral("general", "black", "e10"),
-                       "f1": XQAdvisor("advisor", "red", "f1"),
-                       "f2": "-----------------", "f3": "-----------------",
-                       "f4": "-----------------", "f5": "-----------------",
-                       "f6": "-----------------", "f7": "-----------------",
-                       "f8": "-----------------", "f9": "-----------------",
-                       "f10": XQAdvisor("advisor", "black", "f10"),
-                       "g1": XQElephant("elephant", "red", "g1"),
-                       "g2": "-----------------", "g3": "-----------------",
-                       "g4": XQSoldier("soldier", "red", "g4"),
-                       "g5": "-----------------", "g6": "-----------------",
-                       "g7": XQSoldier("soldier", "black", "g7"),
-                       "g8": "-----------------", "g9": "-----------------",
-                       "g10": XQElephant("elephant", "black", "g10"),
-                       "h1": XQHorse("horse", "red", "h1"),
-                       "h2": "-----------------",
-                       "h3": XQCannon("cannon", "red", "h3"),
-                       "h4": "-----------------", "h5": "-----------------",
-                       "h6": "-----------------", "h7": "-----------------",
-                       "h8": XQCannon("cannon", "black", "h8"),
-                       "h9": "-----------------",
-                       "h10": XQHorse("horse", "black", "h10"),
-                       "i1": XQChariot("chariot", "red", "i1"),
-                       "i2": "-----------------", "i3": "-----------------",
-                       "i4": XQSoldier("soldier", "red", "i4"),
-                       "i5": "-----------------", "i6": "-----------------",
-                       "i7": XQSoldier("soldier", "black", "i7"),
-                       "i8": "-----------------", "i9": "-----------------",
-                       "i10": XQChariot("chariot", "black", "i10")}
-
-        # Each player's pieces are stored in a dictionary.
-        self._red_pieces = {"general": self._board["e1"],
-                            "advisor_1": self._board["d1"],
-                            "advisor_2": self._board["f1"],
-                            "elephant_1": self._board["c1"],
-                            "elephant_2": self._board["g1"],
-                            "horse_1": self._board["b1"],
-                            "horse_2": self._board["h1"],
-                            "chariot_1": self._board["a1"],
-                            "chariot_2": self._board["i1"],
-                            "cannon_1": self._board["b3"],
-                            "cannon_2": self._board["h3"],
-                            "soldier_1": self._board["a4"],
-                            "soldier_2": self._board["c4"],
-                            "soldier_3": self._board["e4"],
-                            "soldier_4": self._board["g4"],
-                            "soldier_5": self._board["i4"]}
-        self._black_pieces = {"general": self._board["e10"],
-                              "advisor_1": self._board["d10"],
-                              "advisor_2": self._board["f10"],
-                              "elephant_1": self._board["c10"],
-                              "elephant_2": self._board["g10"],
-                              "horse_1": self._board["b10"],
-                              "horse_2": self._board["h10"],
-                              "chariot_1": self._board["a10"],
-                              "chariot_2": self._board["i10"],
-                              "cannon_1": self._board["b8"],
-                              "cannon_2": self._board["h8"],
-                              "soldier_1": self._board["a7"],
-                              "soldier_2": self._board["c7"],
-                              "soldier_3": self._board["e7"],
-                              "soldier_4": self._board["g7"],
-                              "soldier_5": self._board["i7"]}
+    def _set_point(self, square, value):
+        """
+        Places value (a XiangqiPiece or the empty marker) at the given flat
+        board index on the board dictionary, the flat array of piece codes, and
+        the occupancy bitboards.
+        """
+        rank, file = divmod(square, 9)
+        self._board[_POSITIONS[square]] = value
 
-    def set_game_state(self, state):
-        """Updates the _game_state to the given state."""
-        self._game_state = state
+        # Any piece already at the point is cleared from the bitboards and hash
+        # first.
+        if self._cells[square]:
+            self._bitboards[self._cells[square] >> 3] &= ~(1 << square)
+            self._file_occupancy[file] &= ~(1 << rank)
+            self._hash ^= _ZOBRIST_KEYS[self._cells[square]][square]
 
-    def get_game_state(self):
-        """Returns the _game_state."""
-        return self._game_state
+        if value == "-----------------":
+            self._cells[square] = 0
 
-    def get_board(self):
-        """Returns the game board."""
-        return self._board
+        else:
+            self._cells[square] = value.get_code()
+            self._bitboards[value.get_code() >> 3] |= 1 << square
+            self._file_occupancy[file] |= 1 << rank
+            self._hash ^= _ZOBRIST_KEYS[value.get_code()][square]
 
     def is_in_check(self, player):
         """Returns True if the given player is in check or False if not."""
@@ -1518,145 +1271,435 @@ class XiangqiGame:
               self._board["g10"], "-", self._board["h10"], "-",
               self._board["i10"])
 
-    def check_check(self, player, ignore_pos):
+    def push(self, move):
+        """
+        Makes the given move without checking whether it is valid and records
+        what is needed to undo it with pop. A move is an (origin, destination)
+        pair of flat board indices. Any captured XiangqiPiece is removed from
+        the board and its player's pieces.
+        """
+        saved_hash = self._hash
+        captured = self._play(move)
+
+        # The undo record holds the move, the captured XiangqiPiece or empty
+        # marker, and the check states, game state, and hash from before the
+        # move.
+        self._history.append((move, captured, self._check_red,
+                              self._check_black, self._game_state, saved_hash))
+
+    def _play(self, move):
+        """
+        Helper function for push and make_move. Makes the given move without
+        recording it and returns the captured XiangqiPiece or empty marker.
+        """
+        origin, destination = move
+        board = self._board
+        piece = board[_POSITIONS[origin]]
+        captured = board[_POSITIONS[destination]]
+
+        if captured != "-----------------":
+
+            if captured.get_player() == "red":
+                del self._red_pieces[captured.get_name()]
+
+            else:
+                del self._black_pieces[captured.get_name()]
+
+        self._set_point(destination, piece)
+        self._set_point(origin, "-----------------")
+        piece.set_square(destination)
+        self._hash ^= _ZOBRIST_BLACK_TURN
+
+        if self._turn == "red":
+            self._turn = "black"
+
+        else:
+            self._turn = "red"
+
+        return captured
+
+    def pop(self):
+        """
+        Undoes the last move made with push, restoring any captured XiangqiPiece
+        along with the check states, game state, turn, and hash, and returns
+        the move.
+        """
+        (move, captured, self._check_red, self._check_black,
+         self._game_state, saved_hash) = self._history.pop()
+        origin, destination = move
+        piece = self._board[_POSITIONS[destination]]
+
+        self._set_point(origin, piece)
+        self._set_point(destination, captured)
+        piece.set_square(origin)
+
+        if captured != "-----------------":
+
+            if captured.get_player() == "red":
+                self._red_pieces[captured.get_name()] = captured
+
+            else:
+                self._black_pieces[captured.get_name()] = captured
+
+        self._hash = saved_hash
+
+        if self._turn == "red":
+            self._turn = "black"
+
+        else:
+            self._turn = "red"
+
+        return move
+
+    def legal_moves(self, player):
+        """
+        Returns a tuple of every legal (origin, destination) move of the given
+        player's XiangqiPieces as flat board indices. Repeated requests for the
+        same position are answered from the MoveCache.
+        """
+        if self._move_cache is None:
+            return tuple(self._generate_legal_moves(player))
+
+        key = (self._hash, player)
+        moves = self._move_cache.get(key)
+
+        if moves is None:
+            moves = tuple(self._generate_legal_moves(player))
+            self._move_cache.put(key, moves)
+
+        return moves
+
+    def legal_captures(self, player):
         """
-        Helper function for make_move and is_checkmate. Checks whether the given
-        player is in check.
+        Returns a tuple of every legal (origin, destination) capture of the
+        given player's XiangqiPieces as flat board indices. Captures are not
+        cached, since a search asks for them once per position.
         """
+        return tuple(self._generate_legal_moves(player, True))
 
+    def _generate_legal_moves(self, player, captures_only=False):
+        """
+        Yields every legal (origin, destination) move of the given player's
+        XiangqiPieces as flat board indices, or only the captures if
+        captures_only is True. The position must be the same each time the
+        generator is resumed.
+        """
         if player == "red":
+            pieces = self._red_pieces
+
+        else:
+            pieces = self._black_pieces
 
-            # Checks the moves of all black pieces.
-            for piece in self._black_pieces:
+        # The checks, pins, and cannon screens around the general are worked
+        # out once for the whole position.
+        checks, evasions, pinned, screens = self._find_pins_and_checks(player)
+        general = self._generals[PLAYER_CODES[player] >> 3]
 
-                # Does not check any piece at the ignore position if it is the
-                # turn of the player being check_check'd so that the moves of a
-                # captured XiangqiPiece will not be considered.
-                if (self._turn == "red" and coords_pos(self._black_pieces[
-                        piece
-                        ].get_coords()) != ignore_pos) or self._turn != "red":
+        for piece in list(pieces.values()):
+            origin = piece.get_square()
 
-                    # Checks whether the position of the red player's general is
-                    # in the move_list of any black piece.
-                    if self._board[ignore_pos].get_unit_type() == "general":
+            if captures_only:
+                targets = piece.get_capture_targets(self)
 
-                        if ignore_pos in self._black_pieces[
-                                piece].get_moves(self):
-                            return True
+            else:
+                targets = piece.get_targets(self)
 
-                    elif coords_pos(self._red_pieces[
-                            "general"].get_coords()) in self._black_pieces[
-                                piece].get_moves(self):
-                        return True
+            for target in targets:
 
-        # Same as above, but checks the black general against all red pieces.
-        if player == "black":
+                # In check, a move other than the general's can only help by
+                # landing on an evasion point or moving a pinned piece, which
+                # includes a cannon's screen. Out of check, a move is legal
+                # unless it moves a pinned piece or becomes a cannon's screen.
+                # General moves and the moves left in doubt are tried on the
+                # board.
+                if piece is general or (pinned >> origin) & 1:
+                    test = True
 
-            for piece in self._red_pieces:
+                elif checks:
 
-                if (self._turn == "black" and coords_pos(self._red_pieces[
-                        piece
-                        ].get_coords()) != ignore_pos) or self._turn != "black":
+                    if not (evasions >> target) & 1:
+                        continue
 
-                    if self._board[ignore_pos].get_unit_type() == "general":
+                    test = True
+
+                else:
+                    test = (screens >> target) & 1
 
-                        if ignore_pos in self._red_pieces[
-                                piece].get_moves(self):
-                            return True
+                if test:
+                    self.push((origin, target))
+                    exposed = self.is_general_attacked(player)
+                    self.pop()
 
-                    elif coords_pos(self._black_pieces[
-                            "general"].get_coords()) in self._red_pieces[
-                                piece].get_moves(self):
-                        return True
+                    if exposed:
+                        continue
 
-        # Checks whether the two generals are on the same file.
-        if self._red_pieces["general"].get_coords()[
-                0] == self._black_pieces["general"].get_coords()[0]:
+                yield origin, target
 
-            # A variable is initialized to store whether any pieces
-            # exist between the two generals.
-            intervene = False
+    def _find_pins_and_checks(self, player):
+        """
+        Returns (checks, evasions, pinned, screens) for the given player's
+        general: the number of the other player's pieces attacking it
+        (including a general facing it), a bitboard of the points a move other
+        than the general's must land on to block or capture a checking piece,
+        a bitboard of the player's pieces that could expose the general by
+        moving, and a bitboard of the empty points that a piece landing on
+        would turn into the screen of a cannon aimed at the general.
+        """
+        cells = self._cells
+        own = PLAYER_CODES[player]
+        enemy = own ^ BLACK
+        general = self._generals[own >> 3].get_square()
+        checks = 0
+        evasions = 0
+        pinned = 0
+        screens = 0
+
+        # Along each line the first three pieces out from the general decide
+        # everything. A chariot or the other general attacks if it is first,
+        # and pins the first piece if it is second. A cannon attacks if it is
+        # second, with the first as its screen, and pins the first two if it
+        # is third. A cannon that is first has only empty points in front of
+        # it, each of which would become its screen.
+        for ray in _RAYS[general]:
+            path = 0
+            blockers = []
+
+            for square in ray:
+                code = cells[square]
+
+                if not code:
+                    path |= 1 << square
+                    continue
+
+                if code == 5 | enemy or code == 1 | enemy:
+
+                    if not blockers:
+                        checks += 1
+                        evasions |= path | 1 << square
+
+                    elif len(blockers) == 1:
+                        pinned |= 1 << blockers[0]
+
+                elif code == 6 | enemy:
+
+                    if not blockers:
+                        screens |= path
+
+                    elif len(blockers) == 1:
+                        checks += 1
+                        evasions |= path | 1 << square
+                        pinned |= 1 << blockers[0]
 
-            # Iterates through each rank between the two generals.
-            for rank in range(self._red_pieces["general"].get_coords()[
-                    1] + 1, self._black_pieces["general"].get_coords()[1]):
+                    else:
+                        pinned |= 1 << blockers[0] | 1 << blockers[1]
 
-                print(rank)
+                blockers.append(square)
 
-                # Checks whether each position along the file is
-                # empty. If any is not, sets intervene to True and
-                # ends the loop.
-                if self._board[coords_pos([self._red_pieces[
-                        "general"].get_coords()[
-                            0], rank])] != "-----------------":
-                    intervene = True
+                if len(blockers) == 3:
                     break
 
-            # If no XiangqiPieces exist between the two generals,
-            # returns True.
-            if not intervene:
+            # Only the player's own pieces are pinned.
+            for square in blockers:
+
+                if (cells[square] & BLACK) != own:
+                    pinned &= ~(1 << square)
+
+        # A horse attacks if its leg is empty, and pins a piece on its leg.
+        for origin, leg in _HORSE_ATTACKERS[general]:
+
+            if cells[origin] == 4 | enemy:
+
+                if not cells[leg]:
+                    checks += 1
+                    evasions |= 1 << origin | 1 << leg
+
+                elif (cells[leg] & BLACK) == own:
+                    pinned |= 1 << leg
+
+        for origin in _SOLDIER_ATTACKERS[enemy >> 3][general]:
+
+            if cells[origin] == 7 | enemy:
+                checks += 1
+                evasions |= 1 << origin
+
+        return checks, evasions, pinned, screens
+
+    def is_square_attacked(self, square, by_player):
+        """
+        Returns True if a XiangqiPiece belonging to by_player could move to the
+        given flat board index, whatever is on it now. Rather than generating
+        the moves of every piece, each kind of attacker is looked for from the
+        square outward, stopping at the first one found.
+        """
+        cells = self._cells
+        colour = PLAYER_CODES[by_player]
+
+        # Soldiers, generals, advisors, and elephants are found with the same
+        # tables used to generate their moves. The general, advisor, and
+        # elephant tables work in both directions, and so does an elephant's
+        # eye.
+        for origin in _SOLDIER_ATTACKERS[colour >> 3][square]:
+
+            if cells[origin] == 7 | colour:
+                return True
+
+        for origin in _GENERAL_MOVES[square]:
+
+            if cells[origin] == 1 | colour:
+                return True
+
+        for origin in _ADVISOR_MOVES[square]:
+
+            if cells[origin] == 2 | colour:
+                return True
+
+        for origin, eye in _ELEPHANT_MOVES[square]:
+
+            if cells[origin] == 3 | colour and not cells[eye]:
+                return True
+
+        # A horse attacks the square if its leg towards the square is empty.
+        for origin, leg in _HORSE_ATTACKERS[square]:
+
+            if cells[origin] == 4 | colour and not cells[leg]:
+                return True
+
+        # A chariot attacks along the square's lines if it is the first piece
+        # reached, and a cannon if it is the second.
+        bitboards = self._bitboards
+        occupied = bitboards[0] | bitboards[1]
+        rank, file = divmod(square, 9)
+        rank_bits = (occupied >> rank * 9) & 511
+        file_bits = self._file_occupancy[file]
+
+        first = (_RANK_CHARIOT_MOVES[file][rank_bits] << rank * 9
+                 | _FILE_CHARIOT_MOVES[rank][file_bits] << file)
+        second = (_RANK_CANNON_CAPTURES[file][rank_bits] << rank * 9
+                  | _FILE_CANNON_CAPTURES[rank][file_bits] << file)
+
+        for origin in _mask_squares(first & bitboards[colour >> 3]):
+
+            if cells[origin] == 5 | colour:
+                return True
+
+        for origin in _mask_squares(second & bitboards[colour >> 3]):
+
+            if cells[origin] == 6 | colour:
                 return True
 
-        # If no check conditions have been met, returns False.
-        print(">>>")
         return False
 
-    def is_checkmate(self, player):
+    def least_valuable_attacker(self, square, by_player):
         """
-        Helper function for make_move. Checks whether the given player is in
-        checkmate.
+        Returns the flat board index of the least valuable XiangqiPiece
+        belonging to by_player that could move to the given flat board index,
+        or None if there is none. Attackers are tried from soldiers through
+        advisors, elephants, horses, cannons, and chariots to the general,
+        with the same lookups from the square outward as is_square_attacked.
+        Pins are not considered.
         """
+        cells = self._cells
+        colour = PLAYER_CODES[by_player]
+
+        for origin in _SOLDIER_ATTACKERS[colour >> 3][square]:
+
+            if cells[origin] == 7 | colour:
+                return origin
+
+        for origin in _ADVISOR_MOVES[square]:
+
+            if cells[origin] == 2 | colour:
+                return origin
+
+        for origin, eye in _ELEPHANT_MOVES[square]:
+
+            if cells[origin] == 3 | colour and not cells[eye]:
+                return origin
+
+        for origin, leg in _HORSE_ATTACKERS[square]:
+
+            if cells[origin] == 4 | colour and not cells[leg]:
+                return origin
+
+        bitboards = self._bitboards
+        occupied = bitboards[0] | bitboards[1]
+        rank, file = divmod(square, 9)
+        rank_bits = (occupied >> rank * 9) & 511
+        file_bits = self._file_occupancy[file]
+
+        second = (_RANK_CANNON_CAPTURES[file][rank_bits] << rank * 9
+                  | _FILE_CANNON_CAPTURES[rank][file_bits] << file)
+
+        for origin in _mask_squares(second & bitboards[colour >> 3]):
+
+            if cells[origin] == 6 | colour:
+                return origin
+
+        first = (_RANK_CHARIOT_MOVES[file][rank_bits] << rank * 9
+                 | _FILE_CHARIOT_MOVES[rank][file_bits] << file)
+
+        for origin in _mask_squares(first & bitboards[colour >> 3]):
+
+            if cells[origin] == 5 | colour:
+                return origin
+
+        for origin in _GENERAL_MOVES[square]:
+
+            if cells[origin] == 1 | colour:
+                return origin
+
+        return None
+
+    def is_general_attacked(self, player):
+        """
+        Returns True if the given player's general could be captured by the
+        other player, or if the two generals face each other on an open file.
+        """
+        red_general = self._generals[0].get_square()
+        black_general = self._generals[1].get_square()
+
+        # The generals face each other when they share a file and no occupied
+        # rank lies strictly between them.
+        if red_general % 9 == black_general % 9:
+            between = ((1 << black_general // 9) - 1) & ~(
+                (2 << red_general // 9) - 1)
+
+            if not self._file_occupancy[red_general % 9] & between:
+                return True
 
         if player == "red":
-            pieces = self._red_pieces
+            return self.is_square_attacked(red_general, "black")
 
-        else:
-            pieces = self._black_pieces
+        return self.is_square_attacked(black_general, "red")
 
-        # Iterates through the checked player's pieces.
-        for piece in pieces:
-
-            # Iterates through each possible move.
-            for move in pieces[piece].get_moves(self):
-
-                # Stores the current values at the origin and destination of
-                # each move for later reference.
-                save_origin = self._board[
-                    coords_pos(pieces[piece].get_coords())]
-                save_destination = self._board[move]
-                save_coords = pieces[piece].get_coords()
-
-                self._board[move] = self._board[
-                    coords_pos(pieces[piece].get_coords())]
-                self._board[coords_pos(pieces[
-                    piece].get_coords())] = "-----------------"
-
-                # Sets the XiangqiPiece's coordinates to its new position.
-                self._board[move].set_coords(move)
-
-                # Checks whether the move got the player out of check. If so,
-                # the board and coords are reset and False is returned.
-                if not self.check_check(player, move):
-                    self._board[move] = save_destination
-                    self._board[coords_pos(save_coords)] = save_origin
-                    save_origin.set_coords(coords_pos(save_coords))
-                    return False
-
-                # If the move did not remove the check on the player, the board
-                # is reset and the loop continues.
-                self._board[move] = save_destination
-                self._board[coords_pos(save_coords)] = save_origin
-                save_origin.set_coords(coords_pos(save_coords))
-
-        # If no move removed the check on the player, True is returned.
-        return True
+    def check_check(self, player):
+        """
+        Helper function for make_move. Checks whether the given player is in
+        check and traces the result.
+        """
+        in_check = self.is_general_attacked(player)
+
+        if self._is_tracing():
+            self._trace("check_check(%s): %s", player, in_check)
+
+        return in_check
+
+    def is_checkmate(self, player):
+        """
+        Helper function for make_move. Checks whether the given player is in
+        checkmate.
+        """
+        # The player is checkmated if there is no legal move that gets them out
+        # of check.
+        return not self.legal_moves(player)
 
     def make_move(self, origin, destination):
         """
         If the origin contains a XiangqiPiece belonging to the current player
         and the destination is a valid move, the XiangqiPiece is moved to the
         destination and any captured enemy XiangqiPiece is removed from the
-        board and the opposing player's list of XiangqiPieces.
+        board and the opposing player's list of XiangqiPieces. Moves made this
+        way are not recorded and cannot be undone with pop.
         """
 
         # Checks if there is a XiangqiPiece at the origin.
@@ -1665,90 +1708,55 @@ class XiangqiGame:
 
         # Checks if XiangqiPiece at the origin belongs to current player.
         if self._board[origin].get_player() != self._turn:
-            return False
 
-        # Checks if the XiangqiPiece at the origin can move to the destination.
-        if destination not in self._board[origin].get_moves(self):
-            return False
-
-        # Saves the current values at the origin and destination so they can be
-        # referred to after the values are updated.
-        save_origin = self._board[origin]
-        save_destination = self._board[destination]
-        save_coords = self._board[origin].get_coords()
-
-        self._board[destination] = self._board[origin]
-        self._board[origin] = "-----------------"
-
-        # Sets the XiangqiPiece's coordinates to its new position.
-        self._board[destination].set_coords(destination)
+            if self._is_tracing():
+                self._trace("%s to %s rejected: not %s's piece", origin,
+                            destination, self._turn)
 
-        # Checks whether the move has placed the player's own general in check.
-        # If so, origin, destination, and XiangqiPiece coords are reset.
-        if self.check_check(self._turn, destination):
-            self._board[destination] = save_destination
-            self._board[origin] = save_origin
-            save_origin.set_coords(coords_pos(save_coords))
             return False
 
-        # If the destination was not blank...
-        if save_destination != "-----------------":
+        # Checks if the destination is on the board and the XiangqiPiece at the
+        # origin can move there without placing the player's own general in
+        # check.
+        if destination not in self._board:
+            return False
 
-            # If the XiangqiPiece at the destination belonged to red player.
-            if save_destination.get_player() == "red":
+        move = (pos_index(origin), pos_index(destination))
 
-                # Iterates through the red player's pieces and deletes the
-                # one that was captured.
-                for piece in self._red_pieces:
+        if move not in self.legal_moves(self._turn):
 
-                    if coords_pos(self._red_pieces[
-                            piece].get_coords()) == destination:
-                        del self._red_pieces[piece]
-                        break
+            if self._is_tracing():
+                self._trace("%s to %s rejected: not a legal move", origin,
+                            destination)
 
-            # If the XiangqiPiece at destination belonged to black player.
-            if save_destination.get_player() == "black":
+            return False
 
-                # Iterates through the black player's pieces and deletes the
-                # one that was captured.
-                for piece in self._black_pieces:
+        player = self._turn
+        self._play(move)
+        opponent = self._turn
 
-                    if coords_pos(self._black_pieces[
-                            piece].get_coords()) == destination:
-                        del self._black_pieces[piece]
-                        break
+        # Checks whether the other player was placed in check and, if so,
+        # whether they are in checkmate.
+        if self.check_check(opponent):
 
-        # Checks whether the other player was placed in check. If so, sets that
-        # player's in check state to True.
-        if self._turn == "red":
+            if opponent == "red":
+                self._check_red = True
 
-            if self.check_check("black", destination):
+            else:
                 self._check_black = True
 
-                # Checks whether the checked player is in checkmate.
-                if self.is_checkmate("black"):
-                    self._game_state = "RED_WON"
-
-            # Sets red player's check state to False.
-            self._check_red = False
-
-        if self._turn == "black":
+            if self.is_checkmate(opponent):
+                self._game_state = player.upper() + "_WON"
 
-            if self.check_check("red", destination):
-                self._check_red = True
-
-                if self.is_checkmate("black"):
-                    self._game_state = "RED_WON"
+            if self._is_tracing():
+                self._trace("%s to %s puts %s in check, game state %s",
+                            origin, destination, opponent, self._game_state)
 
-            self._check_black = False
-
-        # If the move was made successfully, the turn is updated and True is
-        # returned after player pieces and check states, board, and game state
-        # have all been updated.
-        if self._turn == "red":
-            self._turn = "black"
+        # The player who moved can no longer be in check.
+        if player == "red":
+            self._check_red = False
 
         else:
-            self._turn = "red"
+            self._check_black = False
 
         return True
@@ -0,0 +1,411 @@
+# Author: Joseph D Tong
+# Date: 10/18/2026
+# Description: Searches XiangqiGame positions on several CPU cores at once. A
+# RootSplitSearch splits the legal moves at the root across a pool of worker
+# processes, each with its own XiangqiGame and XiangqiSearch, which share the
+# best score found so far through a single shared integer. A LazySMPSearch has
+# every worker search the whole position at slightly different depths, sharing
+# one SharedTranspositionTable kept in shared memory.
+
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+from XiangqiGame import XiangqiGame
+from XiangqiSearch import MATE_BOUND, MATE_SCORE, XiangqiSearch
+
+# Bit layout of the 64-bit data word of a SharedTranspositionTable entry, from
+# the lowest bits up: depth (8 bits), score offset by _SCORE_OFFSET (18 bits),
+# flag (2 bits), move as 1 + origin * 90 + destination or 0 for none (13
+# bits), and generation (8 bits).
+_SCORE_SHIFT = 8
+_FLAG_SHIFT = 26
+_MOVE_SHIFT = 28
+_GENERATION_SHIFT = 41
+_SCORE_OFFSET = 1 << 17
+
+
+class SharedTranspositionTable:
+    """
+    Creates a SharedTranspositionTable with the same probe and store methods
+    as a TranspositionTable of the given size, kept in a block of
+    multiprocessing.shared_memory so several processes can use it at once.
+    Each entry is two 64-bit words: the data packed into one word, and the
+    position's hash XORed with the data. Entries are read and written without
+    locks. An entry torn by two processes writing at once no longer XORs back
+    to its hash, so probe treats it as missing instead of returning bad data.
+
+    The table is created with a new block of shared memory, or attached to an
+    existing one if its name is given. The process that created the table
+    should unlink it when every process is finished with it.
+    """
+    def __init__(self, size=1 << 18, name=None):
+        # Buckets of two entries of two words, rounded down to a power of two
+        # as in TranspositionTable.
+        buckets = 1
+        while buckets * 4 <= size:
+            buckets *= 2
+
+        self._mask = buckets - 1
+        self._size = buckets * 2
+        self._generation = 0
+
+        if name is None:
+            self._memory = shared_memory.SharedMemory(
+                create=True, size=self._size * 16)
+            self._memory.buf[:] = bytes(self._size * 16)
+
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+
+        self._words = self._memory.buf.cast("Q")
+
+    def __getstate__(self):
+        # Processes that are not forked attach to the same block by name.
+        return self._size, self._memory.name
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def get_name(self):
+        """Returns the name of the shared memory block holding the table."""
+        return self._memory.name
+
+    def get_size(self):
+        """Returns the number of entries the table can hold."""
+        return self._size
+
+    def clear(self):
+        """Removes every entry from the table, for every process using it."""
+        self._memory.buf[:] = bytes(self._size * 16)
+        self._generation = 0
+
+    def new_search(self):
+        """
+        Marks the start of a new search, so entries from earlier searches are
+        replaced before anything else.
+        """
+        self._generation = (self._generation + 1) & 0xFF
+
+    def close(self):
+        """Detaches this process from the shared memory block."""
+        self._words.release()
+        self._memory.close()
+
+    def unlink(self):
+        """Frees the shared memory block once every process has closed it."""
+        self._memory.unlink()
+
+    def _unpack(self, key, data):
+        """Returns the probe entry tuple for a hash and packed data word."""
+        move = (data >> _MOVE_SHIFT) & 0x1FFF
+
+        return (key,
+                data & 0xFF,
+                ((data >> _SCORE_SHIFT) & 0x3FFFF) - _SCORE_OFFSET,
+                (data >> _FLAG_SHIFT) & 3,
+                divmod(move - 1, 90) if move else None,
+                data >> _GENERATION_SHIFT)
+
+    def probe(self, key):
+        """
+        Returns the (key, depth, score, flag, move, generation) entry stored for
+        the given hash, or None if there is none.
+        """
+        words = self._words
+        index = (key & self._mask) * 4
+
+        for slot in index, index + 2:
+            data = words[slot + 1]
+
+            if data and words[slot] ^ data == key:
+                return self._unpack(key, data)
+
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        """Stores a search result for the given hash."""
+        words = self._words
+        index = (key & self._mask) * 4
+
+        if move is None:
+            packed_move = 0
+
+        else:
+            packed_move = 1 + move[0] * 90 + move[1]
+
+        data = (min(max(depth, 1), 0xFF)
+                | (score + _SCORE_OFFSET) << _SCORE_SHIFT
+                | flag << _FLAG_SHIFT
+                | packed_move << _MOVE_SHIFT
+                | self._generation << _GENERATION_SHIFT)
+
+        # The first slot keeps the deepest entry, as in TranspositionTable.
+        deepest = words[index + 1]
+        slot = index
+
+        if (deepest and words[index] ^ deepest != key
+                and depth < deepest & 0xFF
+                and deepest >> _GENERATION_SHIFT == self._generation):
+            slot = index + 2
+
+        words[slot + 1] = data
+        words[slot] = key ^ data
+
+
+# The game, search, and shared best root score used by a root-split worker
+# process, and the search iteration it last worked on.
+_worker_game = None
+_worker_search = None
+_shared_alpha = None
+_worker_iteration = None
+
+
+def _start_worker(table_size, shared_alpha):
+    """Sets up a worker process for searching root moves."""
+    global _worker_game, _worker_search, _shared_alpha
+    _worker_game = XiangqiGame()
+    _worker_search = XiangqiSearch(table_size)
+    _shared_alpha = shared_alpha
+
+
+def _search_root_move(fen, move, depth, iteration):
+    """
+    Searches the position after the given root move from the position in the
+    FEN string to one ply less than depth, and returns (move, score for the
+    root player, principal variation, nodes). The search starts from the best
+    score any worker has found for the root so far, and raises it if this move
+    does better. Iteration numbers each depth of each search, so the worker's
+    table and move ordering start a new search once per iteration rather than
+    once per move.
+    """
+    global _worker_iteration
+
+    if iteration != _worker_iteration:
+        _worker_iteration = iteration
+        _worker_search.get_table().new_search()
+        _worker_search.get_orderer().new_search()
+
+    _worker_game.reset(fen)
+    _worker_game.push(move)
+    alpha = _shared_alpha.value
+
+    nodes = _worker_search.get_nodes()
+    score = -_worker_search.search_window(_worker_game, depth - 1, -MATE_SCORE,
+                                          -alpha, 1)
+    nodes = _worker_search.get_nodes() - nodes
+
+    # The score is only exact if it beat the window it was searched with, and
+    # only then can it be the best move.
+    if score > alpha:
+
+        with _shared_alpha.get_lock():
+
+            if score > _shared_alpha.value:
+                _shared_alpha.value = score
+
+        line = [move] + _worker_search.get_principal_variation(_worker_game)
+
+    else:
+        line = [move]
+
+    return move, score, line, nodes
+
+
+def _search_root_task(task):
+    """Unpacks a (fen, move, depth, iteration) task for _search_root_move."""
+    return _search_root_move(*task)
+
+
+class RootSplitSearch:
+    """
+    Creates a RootSplitSearch object that searches XiangqiGame positions with a
+    pool of worker processes (one per CPU core by default), each keeping its
+    own TranspositionTable of the given size between searches. Call close when
+    finished with it.
+    """
+    def __init__(self, processes=None, table_size=1 << 18):
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+
+        self._shared_alpha = multiprocessing.Value("i", -MATE_SCORE)
+        self._pool = multiprocessing.Pool(
+            processes, initializer=_start_worker,
+            initargs=(table_size, self._shared_alpha))
+        self._iteration = 0
+        self._nodes = 0
+        self._depth = 0
+        self._line = []
+
+    def get_nodes(self):
+        """Returns the number of positions visited by the last search."""
+        return self._nodes
+
+    def get_depth(self):
+        """Returns the depth of the last completed search iteration."""
+        return self._depth
+
+    def get_principal_variation(self):
+        """Returns the expected line of play found by the last search."""
+        return self._line
+
+    def close(self):
+        """Stops the worker processes."""
+        self._pool.close()
+        self._pool.join()
+
+    def search(self, xiangqi_game, max_depth=4, time_limit=None):
+        """
+        Searches the given XiangqiGame one ply deeper at a time, up to
+        max_depth, and returns the best (origin, destination) move and its
+        score. The move is None if the player to move has no legal moves. No
+        new depth is started once half the time_limit in seconds is used.
+
+        At each depth the move that was best at the previous depth is searched
+        first on its own, so the others start with a good bound, and then the
+        rest are shared out among the workers. A worker's move can only be the
+        best one if it beats the best score found by then, which is read from
+        and written back to a value shared by all the workers.
+        """
+        start = time.perf_counter()
+        fen = xiangqi_game.to_fen()
+        moves = list(xiangqi_game.legal_moves(xiangqi_game.get_turn()))
+        self._nodes = 0
+        self._depth = 0
+        self._line = []
+        best_move = None
+        best_score = 0
+
+        if not moves:
+            return None, -MATE_SCORE
+
+        for depth in range(1, max_depth + 1):
+            self._shared_alpha.value = -MATE_SCORE
+            self._iteration += 1
+
+            first = self._pool.apply(_search_root_move, (
+                fen, moves[0], depth, self._iteration))
+            results = [first]
+            results.extend(self._pool.imap_unordered(
+                _search_root_task, [(fen, move, depth, self._iteration)
+                                    for move in moves[1:]]))
+
+            # Results that did not beat their window are upper bounds, which
+            # still order the moves for the next depth. Ties go to the move
+            # searched first.
+            order = {move: index for index, move in enumerate(moves)}
+            results.sort(key=lambda result: (-result[1], order[result[0]]))
+            moves = [result[0] for result in results]
+            best_move, best_score, self._line = results[0][:3]
+            self._nodes += sum(result[3] for result in results)
+            self._depth = depth
+
+            # A forced mate cannot be improved on by searching deeper.
+            if abs(best_score) > MATE_BOUND:
+                break
+
+            if (time_limit is not None
+                    and time.perf_counter() - start >= time_limit / 2):
+                break
+
+        return best_move, best_score
+
+
+# The search, game, and stop flag used by a Lazy SMP worker process.
+_smp_search = None
+_smp_game = None
+_smp_stop = None
+
+
+def _start_smp_worker(table, stop):
+    """Sets up a worker process for Lazy SMP searches on the shared table."""
+    global _smp_search, _smp_game, _smp_stop
+    _smp_search = XiangqiSearch(table=table)
+    _smp_game = XiangqiGame()
+    _smp_stop = stop
+
+
+def _smp_task(fen, max_depth, time_limit):
+    """
+    Searches the position in the FEN string until max_depth, the time_limit,
+    or the shared stop flag, and returns (move, score, depth, nodes).
+    """
+    _smp_game.reset(fen)
+    move, score = _smp_search.search(_smp_game, max_depth, time_limit,
+                                     stop=_smp_stop)
+
+    return move, score, _smp_search.get_depth(), _smp_search.get_nodes()
+
+
+class LazySMPSearch:
+    """
+    Creates a LazySMPSearch object that searches XiangqiGame positions with a
+    pool of worker processes (one per CPU core by default) sharing one
+    SharedTranspositionTable of the given size. Call close when finished with
+    it, which also frees the table.
+    """
+    def __init__(self, processes=None, table_size=1 << 20):
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+
+        self._processes = processes
+        self._table = SharedTranspositionTable(table_size)
+        self._stop = multiprocessing.RawValue("b", 0)
+        self._pool = multiprocessing.Pool(
+            processes, initializer=_start_smp_worker,
+            initargs=(self._table, self._stop))
+        self._nodes = 0
+        self._depth = 0
+
+    def get_table(self):
+        """Returns the SharedTranspositionTable used by the workers."""
+        return self._table
+
+    def get_nodes(self):
+        """Returns the number of positions all workers visited last search."""
+        return self._nodes
+
+    def get_depth(self):
+        """Returns the deepest search iteration completed by the last search."""
+        return self._depth
+
+    def close(self):
+        """Stops the worker processes and frees the shared table."""
+        self._pool.close()
+        self._pool.join()
+        self._table.close()
+        self._table.unlink()
+
+    def search(self, xiangqi_game, max_depth=6, time_limit=None):
+        """
+        Searches the given XiangqiGame with every worker and returns the best
+        (origin, destination) move and its score. The move is None if the
+        player to move has no legal moves.
+
+        The first worker searches to max_depth, and every other helper one
+        ply deeper, so the workers reach each position at different times and
+        fill the table for one another. The search ends when the first worker
+        finishes or the time_limit in seconds runs out, and the result of the
+        deepest completed iteration is used, preferring the first worker's.
+        """
+        fen = xiangqi_game.to_fen()
+        self._stop.value = 0
+        tasks = [self._pool.apply_async(_smp_task, (
+            fen, max_depth + (helper % 2), time_limit))
+            for helper in range(self._processes)]
+
+        results = [tasks[0].get()]
+        self._stop.value = 1
+        results.extend(task.get() for task in tasks[1:])
+
+        best = results[0]
+
+        for result in results[1:]:
+
+            if result[0] is not None and result[2] > best[2]:
+                best = result
+
+        self._nodes = sum(result[3] for result in results)
+        self._depth = best[2]
+
+        return best[0], best[1]
@@ -0,0 +1,144 @@
+# Author: Joseph D Tong
+# Date: 10/18/2026
+# Description: Counts the leaf nodes of the XiangqiGame move tree (perft) and
+# benchmarks move generation against known node counts for a set of test
+# positions. Run with an optional maximum depth, e.g.
+# "python XiangqiPerft.py 3".
+
+import sys
+import time
+
+from XiangqiGame import START_FEN, XiangqiGame, index_pos
+
+# Each test position is a name, a FEN string, and the expected node counts for
+# depths 1, 2, 3, and so on. The opening and "midgame" counts are published
+# ones. The others were checked against a separate brute-force count that uses
+# only the original move generator.
+TEST_POSITIONS = [
+    ("opening", START_FEN,
+     [44, 1920, 79666, 3290240, 133312995]),
+    ("midgame",
+     "r1ba1a3/4kn3/2n1b4/pNp1p1p1p/4c4/6P2/P1P2R2P/1CcC5/9/2BAKAB2 w - - 0 1",
+     [38, 1128, 43929, 1339047]),
+    ("central cannon",
+     "rnbakabr1/9/1c4nc1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C1N2/9/RNBAKAB1R w - - 0 1",
+     [34, 1307, 45366]),
+    ("cannon exchange",
+     "1rbakabr1/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/9/9/RNBAKABNR w - - 0 1",
+     [20, 844, 18202]),
+    ("check evasion",
+     "r1bak3r/4a4/2n5n/p1p1p1p1p/6b2/8P/2P1c1P1C/4B2c1/4K2C1/RNBA1A1NR"
+     " w - - 0 1",
+     [6, 237, 6808, 263478]),
+    ("chariot ending", "3aka3/9/9/9/9/9/9/9/9/R2K5 w - - 0 1",
+     [12, 34, 584, 1766]),
+]
+
+
+def perft(xiangqi_game, depth):
+    """
+    Returns the number of legal move sequences of the given depth from the
+    position of the given XiangqiGame.
+    """
+    if depth == 0:
+        return 1
+
+    moves = list(xiangqi_game.legal_moves(xiangqi_game.get_turn()))
+
+    # At the last ply the moves only need to be counted, not made.
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+
+    for move in moves:
+        xiangqi_game.push(move)
+        nodes += perft(xiangqi_game, depth - 1)
+        xiangqi_game.pop()
+
+    return nodes
+
+
+def divide(xiangqi_game, depth):
+    """
+    Returns a dictionary mapping each legal move of the player to move, written
+    as "origin-destination", to the perft count below it. Comparing these
+    against another move generator narrows down where two counts differ.
+    """
+    counts = {}
+
+    for move in list(xiangqi_game.legal_moves(xiangqi_game.get_turn())):
+        xiangqi_game.push(move)
+        counts[index_pos(move[0]) + "-" + index_pos(move[1])] = perft(
+            xiangqi_game, depth - 1)
+        xiangqi_game.pop()
+
+    return counts
+
+
+def run_suite(max_depth, positions=TEST_POSITIONS):
+    """
+    Runs perft on each test position up to max_depth, printing the node count,
+    time, and nodes per second at each depth along with whether the count
+    matches the expected one. Returns True if no count was wrong.
+    """
+    passed = True
+    total_nodes = 0
+    total_time = 0.0
+
+    print("%-16s %5s %12s %12s %9s %11s" % ("position", "depth", "nodes",
+                                            "expected", "seconds",
+                                            "nodes/sec"))
+
+    for name, fen, expected_counts in positions:
+        xiangqi_game = XiangqiGame.from_fen(fen)
+
+        # Positions reached by more than one path would otherwise have their
+        # moves counted from the MoveCache rather than generated.
+        xiangqi_game.set_move_cache(None)
+
+        for depth in range(1, max_depth + 1):
+            start = time.perf_counter()
+            nodes = perft(xiangqi_game, depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+
+            # Depths without a known count are reported but not judged.
+            if depth <= len(expected_counts):
+                expected = expected_counts[depth - 1]
+
+                if nodes == expected:
+                    result = "ok"
+
+                else:
+                    result = "FAIL"
+                    passed = False
+
+            else:
+                expected = "-"
+                result = ""
+
+            print("%-16s %5d %12d %12s %9.3f %11.0f %s" % (
+                name, depth, nodes, expected, elapsed,
+                nodes / elapsed if elapsed else 0, result))
+
+    print("total: %d nodes in %.3f seconds, %.0f nodes/sec" % (
+        total_nodes, total_time, total_nodes / total_time if total_time else 0))
+
+    return passed
+
+
+def main():
+    if len(sys.argv) > 1:
+        max_depth = int(sys.argv[1])
+
+    else:
+        max_depth = 3
+
+    if not run_suite(max_depth):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Author: Joseph D Tong
+# Date: 10/18/2026
+# Description: Replays archived Xiangqi games through a single reusable
+# XiangqiGame, validating every move and reporting the final state of each
+# game. Games are streamed, so archives of any size use constant memory.
+
+import sys
+
+from XiangqiGame import XiangqiGame
+
+
+def parse_game(line, strict=True):
+    """
+    Returns a list of (origin, destination) moves from a line of
+    whitespace-separated positions, e.g. "h3 e3 h10 g8". If the line has an odd
+    number of positions, raises ValueError, or if strict is False, ends the
+    list with the unpaired position as an (origin, None) move, which can never
+    be played.
+    """
+    positions = line.split()
+    moves = list(zip(positions[0::2], positions[1::2]))
+
+    if len(positions) % 2:
+
+        if strict:
+            raise ValueError("a game needs an even number of positions: "
+                             + repr(line))
+
+        moves.append((positions[-1], None))
+
+    return moves
+
+
+def read_games(lines):
+    """
+    Yields the moves of each game in an archive with one game per line. Blank
+    lines and lines starting with "#" are skipped. A truncated line is still
+    yielded as a game, ending in an unplayable (origin, None) move, so one bad
+    line shows up as one invalid game instead of ending the archive.
+    """
+    for line in lines:
+        line = line.strip()
+
+        if line and not line.startswith("#"):
+            yield parse_game(line, strict=False)
+
+
+def replay_games(games, start_fen=None, per_move=False, xiangqi_game=None):
+    """
+    Replays each game from games, an iterable of lists of (origin, destination)
+    moves, through one XiangqiGame that is reset between games. The given
+    xiangqi_game is used if there is one, and is left in the final position of
+    each game while its result is being handled. Yields a dictionary for each
+    game with:
+
+    "index": the game's position in games, counting from 0.
+    "valid": True if every move was legal.
+    "moves_played": the number of moves made before the end or the first
+        invalid move.
+    "invalid_move": the first invalid (origin, destination) move, or None. A
+        move after the game has been won is invalid, and so is the
+        (origin, None) move ending a truncated line from read_games.
+    "game_state", "red_in_check", "black_in_check", "fen": the final state.
+    "captures", "checks": how many moves captured a piece or gave check.
+    "moves": only if per_move is True, a list of (origin, destination,
+        captured unit type or None, True if the move gave check) tuples.
+    """
+    if xiangqi_game is None:
+        xiangqi_game = XiangqiGame(start_fen)
+
+    else:
+        xiangqi_game.reset(start_fen)
+
+    for index, moves in enumerate(games):
+
+        if index:
+            xiangqi_game.reset(start_fen)
+
+        board = xiangqi_game.get_board()
+        moves_played = 0
+        captures = 0
+        checks = 0
+        invalid_move = None
+        move_records = []
+
+        for origin, destination in moves:
+
+            # Looked up before the move, since the captured piece is gone from
+            # the board afterwards. A position that is not on the board is left
+            # for make_move to reject.
+            captured = board.get(destination, "-----------------")
+
+            if (xiangqi_game.get_game_state() != "UNFINISHED"
+                    or origin not in board
+                    or not xiangqi_game.make_move(origin, destination)):
+                invalid_move = (origin, destination)
+                break
+
+            moves_played += 1
+
+            if captured != "-----------------":
+                captured = captured.get_unit_type()
+                captures += 1
+
+            else:
+                captured = None
+
+            gave_check = xiangqi_game.is_in_check(xiangqi_game.get_turn())
+
+            if gave_check:
+                checks += 1
+
+            if per_move:
+                move_records.append((origin, destination, captured,
+                                     gave_check))
+
+        result = {"index": index,
+                  "valid": invalid_move is None,
+                  "moves_played": moves_played,
+                  "invalid_move": invalid_move,
+                  "game_state": xiangqi_game.get_game_state(),
+                  "red_in_check": xiangqi_game.is_in_check("red"),
+                  "black_in_check": xiangqi_game.is_in_check("black"),
+                  "fen": xiangqi_game.to_fen(),
+                  "captures": captures,
+                  "checks": checks}
+
+        if per_move:
+            result["moves"] = move_records
+
+        yield result
+
+
+def main():
+    # Replays the archive file named on the command line, one game per line,
+    # and prints a summary line for each game.
+    with open(sys.argv[1]) as archive:
+
+        for result in replay_games(read_games(archive)):
+
+            if result["valid"]:
+                print(result["index"], result["game_state"],
+                      result["moves_played"], "moves")
+
+            else:
+                print(result["index"], "INVALID at move",
+                      result["moves_played"] + 1, result["invalid_move"])
+
+
+if __name__ == "__main__":
+    main()
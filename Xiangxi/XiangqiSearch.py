@@ -0,0 +1,660 @@
+# Author: Joseph D Tong
+# Date: 10/18/2026
+# Description: Defines a XiangqiSearch class that finds the best move for the
+# player to move in a XiangqiGame using iterative-deepening alpha-beta search
+# with a transposition table and move ordering, followed by a quiescence search
+# of captures, scoring positions with XiangqiEval.
+
+import time
+
+from XiangqiEval import PIECE_VALUES, evaluate
+from XiangqiGame import MoveCache
+
+# Scores are in points from the point of view of the player to move. A
+# checkmate found n plies from the root scores MATE_SCORE - n, so shorter mates
+# are preferred. Anything above MATE_BOUND is a forced mate.
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000
+
+# Move ordering scores. The transposition table move comes first, then
+# captures by most valuable victim and least valuable attacker, then the two
+# killer moves for the ply, then other moves by their history score, which is
+# kept below the killers.
+TABLE_MOVE_SCORE = 3000000
+CAPTURE_SCORE = 2000000
+KILLER_SCORES = (1900000, 1800000)
+HISTORY_LIMIT = 1000000
+
+# Piece values for static exchange evaluation, indexed like PIECE_VALUES. The
+# general is worth more than every other piece together, since losing it loses
+# the game.
+EXCHANGE_VALUES = [0, 1000] + PIECE_VALUES[2:]
+
+# The clock is read once every this many nodes (a power of two). The search
+# visits roughly ten thousand nodes a second, so this is every couple of
+# milliseconds, while reading the clock costs far less than a node.
+CHECK_INTERVAL = 16
+
+# Seconds taken off a time limit to leave room for the nodes between clock
+# readings and for unwinding the search once it stops.
+TIME_MARGIN = 0.01
+
+
+class SearchAborted(Exception):
+    """
+    Raised inside a search when its node or time limit runs out, carrying the
+    ply at which it stopped so the moves made since the root can be undone.
+    """
+    def __init__(self, ply):
+        super().__init__(ply)
+        self.ply = ply
+
+
+class TranspositionTable:
+    """
+    Creates a fixed-size TranspositionTable holding search results keyed by
+    the Zobrist hash of a position. The table is split into buckets of two
+    slots. The first slot keeps the deepest result seen for its bucket, unless
+    it is left over from an earlier search, and the second slot always takes
+    the newest result, so memory use never grows past the given size.
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def __init__(self, size=1 << 18):
+        # The number of buckets is rounded down to a power of two so a hash
+        # can be turned into a bucket with a mask.
+        buckets = 1
+        while buckets * 4 <= size:
+            buckets *= 2
+
+        self._mask = buckets - 1
+        self._slots = [None] * (buckets * 2)
+        self._generation = 0
+
+    def get_size(self):
+        """Returns the number of entries the TranspositionTable can hold."""
+        return len(self._slots)
+
+    def clear(self):
+        """Removes every entry from the TranspositionTable."""
+        self._slots = [None] * len(self._slots)
+        self._generation = 0
+
+    def new_search(self):
+        """
+        Marks the start of a new search, so entries from earlier searches are
+        replaced before anything else.
+        """
+        self._generation += 1
+
+    def probe(self, key):
+        """
+        Returns the (key, depth, score, flag, move, generation) entry stored for
+        the given hash, or None if there is none.
+        """
+        index = (key & self._mask) * 2
+
+        for entry in self._slots[index], self._slots[index + 1]:
+
+            if entry is not None and entry[0] == key:
+                return entry
+
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        """Stores a search result for the given hash."""
+        index = (key & self._mask) * 2
+        entry = (key, depth, score, flag, move, self._generation)
+        deepest = self._slots[index]
+
+        if (deepest is None or deepest[0] == key or depth >= deepest[1]
+                or deepest[5] != self._generation):
+            self._slots[index] = entry
+
+        else:
+            self._slots[index + 1] = entry
+
+
+def score_to_table(score, ply):
+    """
+    Returns a score with mates counted from the current position rather than
+    the root, so it stays correct when the position is reached at another ply.
+    """
+    if score > MATE_BOUND:
+        return score + ply
+
+    if score < -MATE_BOUND:
+        return score - ply
+
+    return score
+
+
+def score_from_table(score, ply):
+    """Reverses score_to_table for a position found at the given ply."""
+    if score > MATE_BOUND:
+        return score - ply
+
+    if score < -MATE_BOUND:
+        return score + ply
+
+    return score
+
+
+def static_exchange(xiangqi_game, move):
+    """
+    Returns the material the player to move in the given XiangqiGame can
+    expect to win with the given capture, if both players then keep
+    recapturing on its destination with their least valuable piece for as long
+    as that gains them material. Recaptures are not checked for leaving the
+    recapturing general in check.
+    """
+    cells = xiangqi_game.get_cells()
+    destination = move[1]
+    gain = EXCHANGE_VALUES[cells[destination] & 7]
+
+    xiangqi_game.push(move)
+    origin = xiangqi_game.least_valuable_attacker(destination,
+                                                  xiangqi_game.get_turn())
+
+    # The opponent recaptures with their least valuable piece, or not at all
+    # if the recapture would lose them material. Making the capture on the
+    # board uncovers any chariot or cannon lined up behind it.
+    if origin is not None:
+        gain -= max(0, static_exchange(xiangqi_game, (origin, destination)))
+
+    xiangqi_game.pop()
+
+    return gain
+
+
+class MoveOrderer:
+    """
+    Creates a MoveOrderer object that sorts the moves at each node so the ones
+    most likely to cause a cutoff are searched first. It remembers two killer
+    moves for each ply (quiet moves that recently caused a cutoff there) and a
+    history score for each (origin, destination) pair, raised whenever that
+    quiet move causes a cutoff.
+    """
+    def __init__(self):
+        self._killers = []
+        self._history = [0] * (90 * 90)
+
+    def clear(self):
+        """Forgets every killer move and history score."""
+        self._killers = []
+        self._history = [0] * (90 * 90)
+
+    def new_search(self):
+        """
+        Forgets the killer moves and halves the history scores, so what was
+        learned in an earlier search counts for less.
+        """
+        self._killers = []
+        self._history = [score // 2 for score in self._history]
+
+    def get_killers(self, ply):
+        """Returns the killer moves for the given ply, most recent first."""
+        if ply < len(self._killers):
+            return list(self._killers[ply])
+
+        return []
+
+    def get_history(self, move):
+        """Returns the history score of the given move."""
+        return self._history[move[0] * 90 + move[1]]
+
+    def order(self, cells, moves, ply, table_move=None):
+        """
+        Sorts the given list of moves in place, best first, for a position with
+        the given flat array of piece codes at the given ply.
+        """
+        if ply < len(self._killers):
+            killers = self._killers[ply]
+
+        else:
+            killers = ()
+
+        history = self._history
+
+        def score(move):
+            if move == table_move:
+                return TABLE_MOVE_SCORE
+
+            victim = cells[move[1]]
+
+            if victim:
+                return (CAPTURE_SCORE + PIECE_VALUES[victim & 7] * 100
+                        - PIECE_VALUES[cells[move[0]] & 7])
+
+            if move in killers:
+                return KILLER_SCORES[killers.index(move)]
+
+            return history[move[0] * 90 + move[1]]
+
+        moves.sort(key=score, reverse=True)
+
+    def record_cutoff(self, cells, move, depth, ply):
+        """
+        Records that the given move caused a cutoff at the given depth and ply
+        in a position with the given flat array of piece codes. Captures are
+        already ordered first, so only quiet moves are remembered.
+        """
+        if cells[move[1]]:
+            return
+
+        while len(self._killers) <= ply:
+            self._killers.append([])
+
+        killers = self._killers[ply]
+
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[len(KILLER_SCORES):]
+
+        index = move[0] * 90 + move[1]
+        self._history[index] += depth * depth
+
+        # Deeper cutoffs count for more. Scores are halved when one grows too
+        # large so they stay below the killers.
+        if self._history[index] >= HISTORY_LIMIT:
+            self._history = [score // 2 for score in self._history]
+
+
+class XiangqiSearch:
+    """
+    Creates a XiangqiSearch object that searches XiangqiGame positions with
+    iterative-deepening negamax alpha-beta search, reusing its
+    TranspositionTable between searches. If an OpeningBook is given, think
+    plays its moves while the game is in the book. A table with the same
+    probe and store methods, such as one shared with other processes, may be
+    given in place of a new TranspositionTable of table_size entries. The
+    game being searched uses the search's own MoveCache while it is searched.
+    """
+    def __init__(self, table_size=1 << 18, book=None, table=None):
+        if table is None:
+            table = TranspositionTable(table_size)
+
+        self._table = table
+        self._orderer = MoveOrderer()
+        self._move_cache = MoveCache()
+        self._book = book
+        self._nodes = 0
+        self._depth = 0
+        self._node_limit = None
+        self._deadline = None
+        self._stop = None
+        self._root_move = None
+        self._root_score = 0
+
+    def get_table(self):
+        """Returns the TranspositionTable used by the search."""
+        return self._table
+
+    def get_orderer(self):
+        """Returns the MoveOrderer used by the search."""
+        return self._orderer
+
+    def get_move_cache(self):
+        """Returns the MoveCache used by games while they are searched."""
+        return self._move_cache
+
+    def get_book(self):
+        """Returns the OpeningBook consulted by think, or None."""
+        return self._book
+
+    def set_book(self, book):
+        """Sets the OpeningBook consulted by think, or None for no book."""
+        self._book = book
+
+    def get_nodes(self):
+        """Returns the number of positions visited by the last search."""
+        return self._nodes
+
+    def get_depth(self):
+        """Returns the depth of the last completed search iteration."""
+        return self._depth
+
+    def search(self, xiangqi_game, max_depth=64, time_limit=None,
+               node_limit=None, stop=None):
+        """
+        Searches the given XiangqiGame one ply deeper at a time, up to
+        max_depth, and returns the best (origin, destination) move and its
+        score. The move is None if the player to move has no legal moves.
+
+        The search stops as soon as it has visited node_limit positions, spent
+        time_limit seconds, or seen the value of the shared flag stop (such as
+        a multiprocessing.RawValue) become true, returning the best move found
+        so far, and the game is left as it was. No new depth is started once
+        half the time limit is used.
+        """
+        start = time.perf_counter()
+        self._table.new_search()
+        self._orderer.new_search()
+        self._nodes = 0
+        self._depth = 0
+        self._node_limit = node_limit
+        self._deadline = None
+
+        if time_limit is not None:
+            self._deadline = start + time_limit - TIME_MARGIN
+        self._stop = stop
+
+        # Every node of the search asks for its legal moves, which would flood
+        # the game's usual MoveCache, so the search's own is used instead.
+        saved_cache = xiangqi_game.get_move_cache()
+        xiangqi_game.set_move_cache(self._move_cache)
+
+        try:
+            return self._deepen(xiangqi_game, max_depth, time_limit, start)
+
+        finally:
+            xiangqi_game.set_move_cache(saved_cache)
+            self._node_limit = None
+            self._deadline = None
+            self._stop = None
+
+    def _deepen(self, xiangqi_game, max_depth, time_limit, start):
+        """
+        Helper function for search. Runs the iterations of the search from
+        depth 1 up to max_depth and returns the best move and its score.
+        """
+        best_move = None
+        best_score = 0
+
+        for depth in range(1, max_depth + 1):
+            self._root_move = None
+
+            try:
+                score = self._negamax(xiangqi_game, depth, -MATE_SCORE,
+                                      MATE_SCORE, 0)
+
+            except SearchAborted as aborted:
+
+                for ply in range(aborted.ply):
+                    xiangqi_game.pop()
+
+                # Root moves are searched best first, so a move that finished
+                # in the unfinished depth is at least as good as the last
+                # depth's best.
+                if self._root_move is not None:
+                    best_move = self._root_move
+                    best_score = self._root_score
+
+                break
+
+            best_move = self._root_move
+            best_score = score
+            self._depth = depth
+
+            # A forced mate cannot be improved on by searching deeper.
+            if abs(score) > MATE_BOUND:
+                break
+
+            # Each iteration typically takes several times longer than the one
+            # before, so a new one is only started in the first half of the
+            # time limit.
+            if (time_limit is not None
+                    and time.perf_counter() - start >= time_limit / 2):
+                break
+
+        # A move is always returned while there is one, even if the limits ran
+        # out before the first depth finished.
+        if best_move is None:
+            moves = xiangqi_game.legal_moves(xiangqi_game.get_turn())
+
+            if moves:
+                best_move = moves[0]
+
+        return best_move, best_score
+
+    def think(self, xiangqi_game, time_ms=None, nodes=None, max_depth=64):
+        """
+        Searches the given XiangqiGame within a budget of time_ms milliseconds
+        and/or nodes positions and returns a dictionary reporting the best
+        "move" found, its "score", the "depth" of the last completed iteration,
+        the "nodes" searched, the "time_ms" taken, and whether the move came
+        from the "book". A book move is played without searching. At least
+        one of time_ms and nodes must be given; use search for a search
+        limited only by depth.
+        """
+        if time_ms is None and nodes is None:
+            raise ValueError("think needs a time_ms or nodes budget")
+
+        start = time.perf_counter()
+
+        if self._book is not None:
+            move = self._book.choose_move(xiangqi_game)
+
+            if move is not None:
+                self._nodes = 0
+                self._depth = 0
+
+                return {"move": move,
+                        "score": 0,
+                        "depth": 0,
+                        "nodes": 0,
+                        "time_ms": (time.perf_counter() - start) * 1000,
+                        "book": True}
+
+        if time_ms is None:
+            time_limit = None
+
+        else:
+            time_limit = time_ms / 1000
+
+        move, score = self.search(xiangqi_game, max_depth, time_limit, nodes)
+
+        return {"move": move,
+                "score": score,
+                "depth": self._depth,
+                "nodes": self._nodes,
+                "time_ms": (time.perf_counter() - start) * 1000,
+                "book": False}
+
+    def search_window(self, xiangqi_game, depth, alpha, beta, ply=0):
+        """
+        Returns the score of the given XiangqiGame for the player to move from
+        a single search of the given depth within the (alpha, beta) window,
+        counting mates from a root ply plies above it. Nodes are added to the
+        count of the last search. Used to search parts of a tree separately,
+        e.g. one root move per process.
+        """
+        saved_cache = xiangqi_game.get_move_cache()
+        xiangqi_game.set_move_cache(self._move_cache)
+
+        try:
+            return self._negamax(xiangqi_game, depth, alpha, beta, ply)
+
+        finally:
+            xiangqi_game.set_move_cache(saved_cache)
+
+    def get_principal_variation(self, xiangqi_game, max_length=32):
+        """
+        Returns the expected line of play from the given XiangqiGame, following
+        the best moves stored in the TranspositionTable.
+        """
+        line = []
+        seen = set()
+
+        while len(line) < max_length:
+            entry = self._table.probe(xiangqi_game.get_hash())
+
+            # Stops at unknown positions and at repetitions, which would
+            # otherwise loop forever.
+            if (entry is None or entry[4] is None
+                    or xiangqi_game.get_hash() in seen):
+                break
+
+            seen.add(xiangqi_game.get_hash())
+            line.append(entry[4])
+            xiangqi_game.push(entry[4])
+
+        for move in line:
+            xiangqi_game.pop()
+
+        return line
+
+    def _count_node(self, ply):
+        """
+        Counts a visit to a position at the given ply, raising SearchAborted
+        if the search is out of nodes or time or has been told to stop.
+        """
+        # The node limit is cheap to test at every node, while the clock and
+        # stop flag are only read every CHECK_INTERVAL nodes.
+        if self._node_limit is not None and self._nodes >= self._node_limit:
+            raise SearchAborted(ply)
+
+        self._nodes += 1
+
+        if not self._nodes & (CHECK_INTERVAL - 1) and (
+                (self._deadline is not None
+                 and time.perf_counter() >= self._deadline)
+                or (self._stop is not None and self._stop.value)):
+            raise SearchAborted(ply)
+
+    def _negamax(self, xiangqi_game, depth, alpha, beta, ply):
+        """
+        Returns the score of the position for the player to move, searching
+        depth plies ahead within the (alpha, beta) window.
+        """
+        # Positions at the horizon are settled by the quiescence search.
+        if depth <= 0:
+            return self._quiesce(xiangqi_game, alpha, beta, ply)
+
+        self._count_node(ply)
+        key = xiangqi_game.get_hash()
+        original_alpha = alpha
+        table_move = None
+
+        # A stored result for this position is used directly when it was
+        # searched at least as deeply and its bound settles the window.
+        entry = self._table.probe(key)
+
+        if entry is not None:
+            table_move = entry[4]
+
+            if ply > 0 and entry[1] >= depth:
+                score = score_from_table(entry[2], ply)
+
+                if entry[3] == TranspositionTable.EXACT:
+                    return score
+
+                if entry[3] == TranspositionTable.LOWER and score >= beta:
+                    return score
+
+                if entry[3] == TranspositionTable.UPPER and score <= alpha:
+                    return score
+
+        moves = list(xiangqi_game.legal_moves(xiangqi_game.get_turn()))
+
+        # A player with no legal moves has lost, whether or not they are in
+        # check.
+        if not moves:
+            return -MATE_SCORE + ply
+
+        # The best move found by an earlier search of this position is tried
+        # first, since it is the most likely to cause a cutoff, followed by
+        # captures, killers, and history.
+        cells = xiangqi_game.get_cells()
+        self._orderer.order(cells, moves, ply, table_move)
+
+        best_score = -MATE_SCORE
+        best_move = None
+
+        for move in moves:
+            xiangqi_game.push(move)
+            score = -self._negamax(xiangqi_game, depth - 1, -beta, -alpha,
+                                   ply + 1)
+            xiangqi_game.pop()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+
+                if ply == 0:
+                    self._root_move = move
+                    self._root_score = score
+
+            if score > alpha:
+                alpha = score
+
+            if alpha >= beta:
+                self._orderer.record_cutoff(cells, move, depth, ply)
+                break
+
+        if best_score <= original_alpha:
+            flag = TranspositionTable.UPPER
+
+        elif best_score >= beta:
+            flag = TranspositionTable.LOWER
+
+        else:
+            flag = TranspositionTable.EXACT
+
+        self._table.store(key, depth, score_to_table(best_score, ply), flag,
+                          best_move)
+
+        return best_score
+
+    def _quiesce(self, xiangqi_game, alpha, beta, ply):
+        """
+        Returns the score of the position for the player to move within the
+        (alpha, beta) window, searching only captures until the position is
+        quiet, so the score is not taken in the middle of an exchange.
+        """
+        self._count_node(ply)
+        player = xiangqi_game.get_turn()
+        cells = xiangqi_game.get_cells()
+
+        # A player in check may not stand pat, so every move out of check is
+        # searched, and with none they have lost.
+        if xiangqi_game.is_general_attacked(player):
+            moves = list(xiangqi_game.legal_moves(player))
+
+            if not moves:
+                return -MATE_SCORE + ply
+
+            best_score = -MATE_SCORE
+
+        # Otherwise the player can decline every capture, so the static score
+        # is a lower bound, and captures that lose material by static exchange
+        # evaluation are not searched.
+        else:
+            best_score = evaluate(xiangqi_game)
+
+            if best_score >= beta:
+                return best_score
+
+            if best_score > alpha:
+                alpha = best_score
+
+            moves = []
+
+            for move in xiangqi_game.legal_captures(player):
+
+                # Taking a piece worth at least the capturing one cannot lose
+                # material, whatever the recaptures.
+                if (EXCHANGE_VALUES[cells[move[1]] & 7]
+                        >= EXCHANGE_VALUES[cells[move[0]] & 7]
+                        or static_exchange(xiangqi_game, move) >= 0):
+                    moves.append(move)
+
+        self._orderer.order(cells, moves, ply)
+
+        for move in moves:
+            xiangqi_game.push(move)
+            score = -self._quiesce(xiangqi_game, -beta, -alpha, ply + 1)
+            xiangqi_game.pop()
+
+            if score > best_score:
+                best_score = score
+
+            if score > alpha:
+                alpha = score
+
+            if alpha >= beta:
+                break
+
+        return best_score
@@ -0,0 +1,643 @@
+# Author: Joseph D Tong
+# Date: 10/18/2026
+# Description: Builds endgame tablebases for XiangqiGame by retrograde
+# analysis and probes them. A tablebase covers one material signature, such
+# as "KRvKAA" (red general and chariot against black general and two
+# advisors), and stores the distance to mate of every position in a file of
+# 16-bit values. Build one, along with the smaller tables it depends on, with
+# "python XiangqiTablebase.py KRvKAA directory [processes]".
+
+import array
+import collections
+import itertools
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+
+from XiangqiGame import (BLACK, XiangqiGame, cells_to_fen, _ADVISOR_POINTS,
+                         _ELEPHANT_POINTS)
+
+# Each stored value is 0 for a draw, n > 0 if the player to move wins by mate
+# in n plies, or -(n + 1) if the player to move is mated in n plies, so being
+# mated already (n = 0) is distinct from a draw. Positions that cannot arise,
+# such as ones with two pieces on a point or with the player who just moved in
+# check, are ILLEGAL.
+ILLEGAL = -32768
+
+# Piece letters in signature order, as in FEN, indexed by unit type code.
+_SIGNATURE_LETTERS = " KABNRCP"
+
+# Stored values are little-endian 16-bit integers.
+_VALUE = struct.Struct("<h")
+
+# Placeholder for positions whose value is not known yet during a build.
+_UNKNOWN = 32767
+
+TABLE_SUFFIX = ".xtb"
+
+
+def _allowed_squares(code):
+    """
+    Returns a tuple of the flat board indices that a piece with the given code
+    can ever stand on, in increasing order.
+    """
+    unit_code = code & 7
+    black = code & BLACK
+
+    if unit_code == 1:
+        return tuple(rank * 9 + file for rank in ((7, 8, 9) if black
+                                                  else (0, 1, 2))
+                     for file in (3, 4, 5))
+
+    if unit_code == 2:
+        return tuple(sorted(square for square in _ADVISOR_POINTS
+                            if (square >= 45) == bool(black)))
+
+    if unit_code == 3:
+        return tuple(sorted(square for square in _ELEPHANT_POINTS
+                            if (square >= 45) == bool(black)))
+
+    # Soldiers start on alternate files of their own side and can only move
+    # forward until they cross the river, after which they can go anywhere on
+    # the other side.
+    if unit_code == 7:
+
+        if black:
+            return tuple(square for square in range(90) if square < 45
+                         or (square < 63 and square % 9 % 2 == 0))
+
+        return tuple(square for square in range(90) if square >= 45
+                     or (square >= 27 and square % 9 % 2 == 0))
+
+    return tuple(range(90))
+
+
+def parse_signature(signature):
+    """
+    Returns a dictionary mapping piece codes to counts for a material signature
+    such as "KRvKAA", which lists red's pieces, then "v", then black's, each
+    starting with a general ("K"). E and H may be used for elephants and
+    horses. Raises ValueError if the signature is invalid.
+    """
+    sides = signature.upper().replace("E", "B").replace("H", "N").split("V")
+
+    if len(sides) != 2:
+        raise ValueError("signature must have two sides split by v: "
+                         + repr(signature))
+
+    counts = {}
+
+    for colour, side in zip((0, BLACK), sides):
+
+        if side.count("K") != 1:
+            raise ValueError("each side needs exactly one general: "
+                             + repr(signature))
+
+        for letter in side:
+
+            if letter not in _SIGNATURE_LETTERS[1:]:
+                raise ValueError("unknown piece " + repr(letter) + " in "
+                                 + repr(signature))
+
+            code = _SIGNATURE_LETTERS.index(letter) | colour
+            counts[code] = counts.get(code, 0) + 1
+
+    return counts
+
+
+def format_signature(counts):
+    """
+    Returns the canonical material signature for a dictionary mapping piece
+    codes to counts, e.g. "KRvKAA".
+    """
+    sides = []
+
+    for colour in 0, BLACK:
+        sides.append("".join(_SIGNATURE_LETTERS[unit_code] * counts.get(
+            unit_code | colour, 0) for unit_code in range(1, 8)))
+
+    return "v".join(sides)
+
+
+def cells_signature(cells):
+    """
+    Returns the material signature of the position in the given sequence of 90
+    piece codes.
+    """
+    sides = []
+
+    for colour in 0, BLACK:
+        sides.append("".join(_SIGNATURE_LETTERS[unit_code] * cells.count(
+            unit_code | colour) for unit_code in range(1, 8)))
+
+    return "v".join(sides)
+
+
+def sub_signatures(signature):
+    """
+    Returns the signatures reachable from the given one by a single capture of
+    a piece other than a general, in canonical form.
+    """
+    counts = parse_signature(signature)
+    subs = []
+
+    for code in sorted(counts):
+
+        if code & 7 != 1:
+            smaller = dict(counts)
+            smaller[code] -= 1
+            subs.append(format_signature(smaller))
+
+    return subs
+
+
+class TableLayout:
+    """
+    Creates a TableLayout object that numbers every placement of the pieces in
+    the given material signature, with either player to move. Each group of
+    identical pieces is numbered by the combination of allowed points it
+    occupies, the groups are combined in mixed radix, and the lowest bit of an
+    index is set when black is to move.
+    """
+    def __init__(self, signature):
+        counts = parse_signature(signature)
+        self._signature = format_signature(counts)
+        self._groups = []
+        self._size = 2
+
+        for code in sorted(counts):
+            squares = _allowed_squares(code)
+            combinations = list(itertools.combinations(squares, counts[code]))
+            ranks = {combination: rank for rank, combination in enumerate(
+                combinations)}
+            self._groups.append((code, combinations, ranks))
+            self._size *= len(combinations)
+
+        # Maps each piece code to its group, for indexing a cell array.
+        self._group_of = {code: group for group, (code, combinations, ranks)
+                          in enumerate(self._groups)}
+
+    def get_signature(self):
+        """Returns the canonical material signature of the TableLayout."""
+        return self._signature
+
+    def get_size(self):
+        """Returns the number of indices in the TableLayout."""
+        return self._size
+
+    def index(self, cells, black_to_move):
+        """
+        Returns the index of the position in the given sequence of 90 piece
+        codes, which must have this layout's material, or None if a piece is
+        on a point its group does not allow.
+        """
+        placements = [[] for group in self._groups]
+
+        for square, code in enumerate(cells):
+
+            if code:
+                placements[self._group_of[code]].append(square)
+
+        index = 0
+
+        for (code, combinations, ranks), squares in zip(self._groups,
+                                                        placements):
+            rank = ranks.get(tuple(squares))
+
+            if rank is None:
+                return None
+
+            index = index * len(combinations) + rank
+
+        return index * 2 + (1 if black_to_move else 0)
+
+    def cells(self, index):
+        """
+        Returns a (cells, black_to_move) pair for the given index, where cells
+        is a bytearray of 90 piece codes, or None if two pieces would share a
+        point.
+        """
+        black_to_move = index & 1
+        index >>= 1
+        cells = bytearray(90)
+        pieces = 0
+
+        for code, combinations, ranks in reversed(self._groups):
+            index, rank = divmod(index, len(combinations))
+
+            for square in combinations[rank]:
+                cells[square] = code
+                pieces += 1
+
+        if sum(1 for code in cells if code) != pieces:
+            return None
+
+        return cells, bool(black_to_move)
+
+
+def _value_rank(value):
+    """
+    Returns a key that orders stored values from worst to best for the player
+    to move: slower losses beat faster ones, a draw beats any loss, and faster
+    wins beat slower ones.
+    """
+    if value > 0:
+        return 2, -value
+
+    if value < 0:
+        return 0, -value
+
+    return 1, 0
+
+
+def _best_value(child_values):
+    """
+    Returns the stored value of a position for the player to move, given the
+    stored values of the positions after each of their moves (which are from
+    the opponent's point of view), or None if there are none.
+    """
+    best = None
+
+    for value in child_values:
+
+        # A child lost in n plies is a win in n + 1, and a child won in n plies
+        # is a loss in n + 1.
+        if value < 0:
+            mine = -value
+
+        elif value > 0:
+            mine = -value - 2
+
+        else:
+            mine = 0
+
+        if best is None or _value_rank(mine) > _value_rank(best):
+            best = mine
+
+    return best
+
+
+class Tablebase:
+    """
+    Creates a Tablebase object that probes the table files in the given
+    directory. Each table is memory-mapped read-only the first time a position
+    with its material is probed, so tables are shared by every process that
+    probes them.
+    """
+    def __init__(self, directory):
+        self._directory = directory
+        self._tables = {}
+
+    def get_directory(self):
+        """Returns the directory the Tablebase reads its tables from."""
+        return self._directory
+
+    def close(self):
+        """Unmaps every table opened by the Tablebase."""
+        for table in self._tables.values():
+
+            if table is not None:
+                table[1].close()
+
+        self._tables = {}
+
+    def _table(self, signature):
+        """
+        Returns the (TableLayout, mapped file) pair for the given canonical
+        signature, or None if there is no table for it.
+        """
+        if signature not in self._tables:
+            path = table_path(self._directory, signature)
+
+            if os.path.exists(path):
+
+                with open(path, "rb") as table_file:
+                    data = mmap.mmap(table_file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+
+                self._tables[signature] = (TableLayout(signature), data)
+
+            else:
+                self._tables[signature] = None
+
+        return self._tables[signature]
+
+    def probe_cells(self, cells, black_to_move):
+        """
+        Returns the stored value of the position in the given sequence of 90
+        piece codes, or None if there is no table for its material or the
+        position cannot arise.
+        """
+        table = self._table(cells_signature(cells))
+
+        if table is None:
+            return None
+
+        index = table[0].index(cells, black_to_move)
+
+        if index is None:
+            return None
+
+        value = _VALUE.unpack_from(table[1], index * 2)[0]
+
+        if value == ILLEGAL:
+            return None
+
+        return value
+
+    def probe(self, xiangqi_game):
+        """
+        Returns a ("win", "loss", or "draw", plies to mate) pair for the player
+        to move in the given XiangqiGame, or None if the position is not in the
+        Tablebase.
+        """
+        value = self.probe_cells(xiangqi_game.get_cells(),
+                                 xiangqi_game.get_turn() == "black")
+
+        if value is None:
+            return None
+
+        if value > 0:
+            return "win", value
+
+        if value < 0:
+            return "loss", -value - 1
+
+        return "draw", 0
+
+
+def table_path(directory, signature):
+    """Returns the path of the table file for the given signature."""
+    return os.path.join(directory, format_signature(parse_signature(
+        signature)) + TABLE_SUFFIX)
+
+
+# The layout, game, and Tablebase used by a worker process while building.
+_worker = None
+
+
+def _start_worker(signature, directory):
+    """Sets up a worker process for computing the successors of positions."""
+    global _worker
+    xiangqi_game = XiangqiGame()
+    xiangqi_game.set_move_cache(None)
+    _worker = (TableLayout(signature), xiangqi_game, Tablebase(directory))
+
+
+def _successors(start, stop):
+    """
+    Returns a list with, for each index from start to stop, None if the
+    position cannot arise, or a (child indices, capture value) pair. The child
+    indices are those of the positions after each non-capturing legal move,
+    and the capture value is the best stored value for the player to move over
+    their captures (looked up in the smaller tables), or None if there are
+    none.
+    """
+    layout, xiangqi_game, tablebase = _worker
+    results = []
+
+    for index in range(start, stop):
+        position = layout.cells(index)
+
+        if position is None:
+            results.append(None)
+            continue
+
+        cells, black_to_move = position
+        player = "black" if black_to_move else "red"
+        xiangqi_game.reset(cells_to_fen(cells, player))
+
+        # The player who just moved cannot have left their general attacked,
+        # and the generals cannot face each other.
+        if xiangqi_game.is_general_attacked("red" if black_to_move
+                                            else "black"):
+            results.append(None)
+            continue
+
+        children = []
+        capture_values = []
+
+        for move in xiangqi_game.legal_moves(player):
+            captures = cells[move[1]]
+            xiangqi_game.push(move)
+
+            if captures:
+                capture_values.append(tablebase.probe_cells(
+                    xiangqi_game.get_cells(), not black_to_move))
+
+            else:
+                children.append(layout.index(xiangqi_game.get_cells(),
+                                             not black_to_move))
+
+            xiangqi_game.pop()
+
+        results.append((children, _best_value(capture_values)))
+
+    return results
+
+
+def _successors_task(bounds):
+    """Unpacks a (start, stop) range for _successors in a worker process."""
+    return _successors(*bounds)
+
+
+def build_table(signature, directory, processes=None, chunk_size=4096):
+    """
+    Builds the table for the given signature in the given directory, first
+    building any smaller table it depends on that is missing. The successors
+    of every position are computed across a pool of processes (one per CPU
+    core by default), then the values are found by retrograde analysis, from
+    the mates outward. Returns the path of the table file.
+    """
+    for sub in sub_signatures(signature):
+
+        if not os.path.exists(table_path(directory, sub)):
+            build_table(sub, directory, processes, chunk_size)
+
+    layout = TableLayout(signature)
+    size = layout.get_size()
+    ranges = [(start, min(start + chunk_size, size))
+              for start in range(0, size, chunk_size)]
+
+    # Successors are stored compactly, with the children of position i at
+    # children[offsets[i]:offsets[i + 1]].
+    offsets = array.array("q", [0])
+    children = array.array("i")
+    capture_values = array.array("h")
+    legal = bytearray(size)
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, initializer=_start_worker,
+                                    initargs=(layout.get_signature(),
+                                              directory))
+        chunks = pool.imap(_successors_task, ranges)
+
+    else:
+        pool = None
+        _start_worker(layout.get_signature(), directory)
+        chunks = map(_successors_task, ranges)
+
+    index = 0
+
+    for results in chunks:
+
+        for result in results:
+
+            if result is not None:
+                legal[index] = 1
+                children.extend(result[0])
+
+                if result[1] is None:
+                    capture_values.append(_UNKNOWN)
+
+                else:
+                    capture_values.append(result[1])
+
+            else:
+                capture_values.append(_UNKNOWN)
+
+            offsets.append(len(children))
+            index += 1
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    values = _retrograde(size, legal, offsets, children, capture_values)
+    path = table_path(directory, signature)
+
+    if sys.byteorder != "little":
+        values.byteswap()
+
+    with open(path, "wb") as table_file:
+        values.tofile(table_file)
+
+    return path
+
+
+def _retrograde(size, legal, offsets, children, capture_values):
+    """
+    Returns an array of the stored value of every position, given each
+    position's non-capturing children and best capture value (_UNKNOWN if it
+    has no captures).
+    """
+    # Each position's parents are found by inverting the children lists.
+    parent_offsets = array.array("q", [0]) * (size + 1)
+
+    for child in children:
+        parent_offsets[child + 1] += 1
+
+    for index in range(size):
+        parent_offsets[index + 1] += parent_offsets[index]
+
+    parents = array.array("i", [0]) * len(children)
+    filled = array.array("q", parent_offsets)
+
+    for index in range(size):
+
+        for child in children[offsets[index]:offsets[index + 1]]:
+            parents[filled[child]] = index
+            filled[child] += 1
+
+    values = array.array("h", [_UNKNOWN]) * size
+    unresolved = array.array("i", [0]) * size
+
+    # Positions waiting to be given a value, by plies to mate. A win may be
+    # queued more than once, and only the first (fastest) is kept.
+    queued = collections.defaultdict(list)
+
+    for index in range(size):
+
+        if not legal[index]:
+            values[index] = ILLEGAL
+            continue
+
+        unresolved[index] = offsets[index + 1] - offsets[index]
+        capture = capture_values[index]
+
+        if capture != _UNKNOWN and capture > 0:
+            queued[capture].append((index, capture))
+
+        if not unresolved[index]:
+
+            # With no quiet moves, the position's value is that of its best
+            # capture, or a loss now if it has no moves at all.
+            if capture == _UNKNOWN:
+                queued[0].append((index, -1))
+
+            elif capture < 0:
+                queued[-capture - 1].append((index, capture))
+
+            elif capture == 0:
+                values[index] = 0
+
+    plies = 0
+
+    while queued:
+
+        for index, value in queued.pop(plies, ()):
+
+            if values[index] != _UNKNOWN:
+                continue
+
+            values[index] = value
+
+            for parent in parents[parent_offsets[index]:
+                                  parent_offsets[index + 1]]:
+
+                if values[parent] != _UNKNOWN:
+                    continue
+
+                # A parent can win by moving into a lost position. Otherwise
+                # it loses once every quiet move leads to a win for the
+                # opponent, unless a capture does better.
+                if value < 0:
+                    queued[plies + 1].append((parent, plies + 1))
+                    continue
+
+                unresolved[parent] -= 1
+
+                if not unresolved[parent]:
+                    capture = capture_values[parent]
+
+                    if capture == _UNKNOWN or capture < 0:
+                        loss = plies + 1
+
+                        if capture != _UNKNOWN:
+                            loss = max(loss, -capture - 1)
+
+                        queued[loss].append((parent, -loss - 1))
+
+        plies += 1
+
+    # Whatever is left can be held forever, so it is a draw.
+    for index in range(size):
+
+        if values[index] == _UNKNOWN:
+            values[index] = 0
+
+    return values
+
+
+def main():
+    # Builds the table for the signature named on the command line, and any
+    # smaller tables it needs, in the directory named after it, using the
+    # number of processes given after that or every core.
+    if len(sys.argv) > 3:
+        processes = int(sys.argv[3])
+
+    else:
+        processes = None
+
+    os.makedirs(sys.argv[2], exist_ok=True)
+    path = build_table(sys.argv[1], sys.argv[2], processes)
+    print("wrote", path)
+
+
+if __name__ == "__main__":
+    main()
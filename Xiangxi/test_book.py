@@ -0,0 +1,136 @@
+import unittest
+import os
+import random
+import struct
+import tempfile
+from XiangqiBook import MAX_WEIGHT
+from XiangqiBook import OpeningBook
+from XiangqiBook import RECORD_SIZE
+from XiangqiBook import write_book
+from XiangqiGame import XiangqiGame
+from XiangqiGame import pos_index
+from XiangqiSearch import XiangqiSearch
+
+
+class TestCase(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+        self.books = []
+
+    def tearDown(self):
+        for book in self.books:
+            book.close()
+
+        os.remove(self.path)
+
+    def open_book(self, entries):
+        """Writes the given entries to the test's book file and opens it."""
+        write_book(self.path, entries)
+        book = OpeningBook(self.path)
+        self.books.append(book)
+
+        return book
+
+    # Tests whether probe finds every stored hash, including the first and
+    # last records, and nothing for hashes between or around them
+    def test_probe_01(self):
+        keys = [0, 1, 5, 7, 1 << 40, (1 << 64) - 1]
+        entries = []
+
+        for key in keys:
+            for destination in range(key % 3 + 1):
+                entries.append((key, (0, destination), destination + 1))
+
+        book = self.open_book(entries)
+        self.assertEqual(book.get_size(), len(entries))
+
+        for key in keys:
+            expected = [((0, destination), destination + 1)
+                        for destination in range(key % 3 + 1)]
+            moves = book.probe(key)
+            self.assertEqual(moves,
+                             expected,
+                             msg="Expected {} got {} for {}".format(
+                                 expected, moves, key))
+
+        for key in [2, 4, 6, 8, (1 << 40) + 1, (1 << 64) - 2]:
+            self.assertEqual(book.probe(key), [])
+
+    # Tests whether repeated moves from the same position are stored once
+    # with their weights added
+    def test_write_book_01(self):
+        book = self.open_book([(3, (1, 2), 1), (3, (1, 2), 4), (3, (1, 3), 2),
+                               (9, (1, 2), 1)])
+        self.assertEqual(book.get_size(), 3)
+        self.assertEqual(book.probe(3), [((1, 2), 5), ((1, 3), 2)])
+        self.assertEqual(book.probe(9), [((1, 2), 1)])
+
+    # Tests whether weights above MAX_WEIGHT are stored as MAX_WEIGHT
+    def test_write_book_02(self):
+        book = self.open_book([(3, (1, 2), MAX_WEIGHT),
+                               (3, (1, 2), MAX_WEIGHT),
+                               (3, (1, 3), MAX_WEIGHT + 1)])
+        self.assertEqual(book.probe(3),
+                         [((1, 2), MAX_WEIGHT), ((1, 3), MAX_WEIGHT)])
+
+    # Tests whether moves with no positive weight are left out of the book
+    def test_write_book_03(self):
+        book = self.open_book([(3, (1, 2), 0), (3, (1, 3), 2),
+                               (3, (1, 3), -2), (4, (1, 2), 0)])
+        self.assertEqual(book.get_size(), 0)
+
+    # Tests whether an empty book file opens as a book with no moves
+    def test_empty_01(self):
+        book = self.open_book([])
+        self.assertEqual(os.path.getsize(self.path), 0)
+        self.assertEqual(book.get_size(), 0)
+        self.assertEqual(book.probe(0), [])
+        self.assertIsNone(book.choose_move(XiangqiGame()))
+
+    # Tests whether a file that is not a whole number of records raises
+    # ValueError
+    def test_empty_02(self):
+        with open(self.path, "wb") as book_file:
+            book_file.write(b"\0" * (RECORD_SIZE + 1))
+
+        self.assertRaises(ValueError, OpeningBook, self.path)
+
+    # Tests whether moves that are not legal in the position are left out,
+    # and whether the remaining move is the one chosen
+    def test_get_moves_01(self):
+        xiangqi_game = XiangqiGame()
+        key = xiangqi_game.get_hash()
+        legal = (pos_index("h3"), pos_index("e3"))
+        book = self.open_book([(key, legal, 1),
+                               (key, (pos_index("h3"), pos_index("h9")), 50),
+                               (key, (pos_index("e1"), pos_index("e3")), 50)])
+        self.assertEqual(book.get_moves(xiangqi_game), [(legal, 1)])
+
+        for seed in range(5):
+            self.assertEqual(book.choose_move(xiangqi_game,
+                                              random.Random(seed)),
+                             legal)
+
+    # Tests whether a book written elsewhere with only weight 0 moves gives no
+    # move, and think searches instead
+    def test_choose_move_01(self):
+        xiangqi_game = XiangqiGame()
+        move = (pos_index("h3"), pos_index("e3"))
+
+        with open(self.path, "wb") as book_file:
+            book_file.write(struct.pack(">QBBH", xiangqi_game.get_hash(),
+                                        move[0], move[1], 0))
+
+        book = OpeningBook(self.path)
+        self.books.append(book)
+        self.assertIsNone(book.choose_move(xiangqi_game))
+
+        result = XiangqiSearch(book=book).think(xiangqi_game, nodes=200)
+        self.assertFalse(result["book"])
+        self.assertIn(result["move"], xiangqi_game.legal_moves("red"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+import unittest
+import random
+from unittest import mock
+import XiangqiEval
+from XiangqiEval import cells_array
+from XiangqiEval import evaluate
+from XiangqiEval import evaluate_batch
+from XiangqiEval import evaluate_cells
+from XiangqiGame import XiangqiGame
+
+
+def random_games(count, seed):
+    """
+    Returns a list of count XiangqiGames, each reached by playing up to 60
+    random legal moves from the opening position, with both players to move.
+    """
+    generator = random.Random(seed)
+    xiangqi_games = []
+
+    for game in range(count):
+        xiangqi_game = XiangqiGame()
+
+        for ply in range(generator.randrange(60)):
+            moves = xiangqi_game.legal_moves(xiangqi_game.get_turn())
+
+            if not moves:
+                break
+
+            xiangqi_game.push(generator.choice(moves))
+
+        xiangqi_games.append(xiangqi_game)
+
+    return xiangqi_games
+
+
+class TestCase(unittest.TestCase):
+
+    # Tests whether the opening position scores evenly and whether evaluate
+    # scores from the point of view of the player to move
+    def test_evaluate_01(self):
+        self.assertEqual(evaluate(XiangqiGame()), 0)
+
+        for xiangqi_game in random_games(20, 1):
+            score = evaluate_cells(xiangqi_game.get_cells())
+
+            if xiangqi_game.get_turn() == "black":
+                score = -score
+
+            self.assertEqual(evaluate(xiangqi_game), score)
+
+    # Tests whether a NumPy batch gives the same scores as scoring each
+    # position on its own, for red and for the player to move
+    @unittest.skipIf(XiangqiEval.numpy is None, "NumPy is not installed")
+    def test_evaluate_batch_01(self):
+        xiangqi_games = random_games(50, 2)
+        positions = cells_array(xiangqi_games)
+        black_to_move = [xiangqi_game.get_turn() == "black"
+                         for xiangqi_game in xiangqi_games]
+        self.assertEqual(positions.shape, (50, 90))
+
+        scores = evaluate_batch(positions).tolist()
+        expected = [evaluate_cells(xiangqi_game.get_cells())
+                    for xiangqi_game in xiangqi_games]
+        self.assertEqual(scores,
+                         expected,
+                         msg="Expected {} got {}".format(expected, scores))
+
+        scores = evaluate_batch(positions, black_to_move).tolist()
+        expected = [evaluate(xiangqi_game) for xiangqi_game in xiangqi_games]
+        self.assertEqual(scores,
+                         expected,
+                         msg="Expected {} got {}".format(expected, scores))
+
+    # Tests whether evaluate_batch falls back to lists without NumPy, and
+    # whether cells_array then raises ImportError
+    def test_evaluate_batch_02(self):
+        xiangqi_games = random_games(20, 3)
+        positions = [xiangqi_game.get_cells() for xiangqi_game in xiangqi_games]
+        black_to_move = [xiangqi_game.get_turn() == "black"
+                         for xiangqi_game in xiangqi_games]
+
+        with mock.patch.object(XiangqiEval, "numpy", None):
+            self.assertRaises(ImportError, cells_array, xiangqi_games)
+            scores = evaluate_batch(positions)
+            expected = [evaluate_cells(cells) for cells in positions]
+            self.assertEqual(scores, expected)
+
+            scores = evaluate_batch(positions, black_to_move)
+            expected = [evaluate(xiangqi_game)
+                        for xiangqi_game in xiangqi_games]
+            self.assertEqual(scores,
+                             expected,
+                             msg="Expected {} got {}".format(expected, scores))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
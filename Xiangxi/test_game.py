@@ -0,0 +1,275 @@
+import unittest
+import random
+from XiangqiGame import XiangqiGame
+from XiangqiGame import index_pos
+from XiangqiGame import pos_index
+from XiangqiGame import START_FEN
+
+
+def random_game(xiangqi_game, plies, seed):
+    """
+    Plays up to plies random legal moves with push on the given XiangqiGame
+    and returns the moves played.
+    """
+    generator = random.Random(seed)
+    moves = []
+
+    for ply in range(plies):
+        legal = xiangqi_game.legal_moves(xiangqi_game.get_turn())
+
+        if not legal:
+            break
+
+        move = generator.choice(legal)
+        xiangqi_game.push(move)
+        moves.append(move)
+
+    return moves
+
+
+class TestCase(unittest.TestCase):
+
+    # Tests whether the incremental hash matches a hash computed from scratch
+    # after every move of several random games
+    def test_hash_01(self):
+        generator = random.Random(5)
+        xiangqi_game = XiangqiGame()
+
+        for game in range(20):
+            xiangqi_game.reset()
+
+            for ply in range(150):
+                fen = xiangqi_game.to_fen()
+                expected = XiangqiGame.from_fen(fen).get_hash()
+                self.assertEqual(xiangqi_game.get_hash(),
+                                 expected,
+                                 msg="Hash differs from scratch at {}".format(
+                                     fen))
+                legal = xiangqi_game.legal_moves(xiangqi_game.get_turn())
+
+                if not legal:
+                    break
+
+                xiangqi_game.push(generator.choice(legal))
+
+    # Tests whether the same placement hashes differently with the other
+    # player to move
+    def test_hash_02(self):
+        red = XiangqiGame.from_fen(XiangqiGame().to_fen())
+        black = XiangqiGame.from_fen(red.to_fen().replace(" w ", " b "))
+        self.assertNotEqual(red.get_hash(), black.get_hash())
+
+    # Tests whether two move orders reaching the same position give the same
+    # hash
+    def test_hash_03(self):
+        first = XiangqiGame()
+        second = XiangqiGame()
+
+        for origin, destination in [("h3", "e3"), ("h10", "g8"),
+                                    ("b3", "d3"), ("b10", "c8")]:
+            first.make_move(origin, destination)
+
+        for origin, destination in [("b3", "d3"), ("b10", "c8"),
+                                    ("h3", "e3"), ("h10", "g8")]:
+            second.make_move(origin, destination)
+
+        self.assertEqual(first.to_fen(), second.to_fen())
+        self.assertEqual(first.get_hash(),
+                         second.get_hash(),
+                         msg="Expected {} got {}".format(first.get_hash(),
+                                                         second.get_hash()))
+
+    # Tests whether make_move updates the hash the same way as push
+    def test_hash_04(self):
+        pushed = XiangqiGame()
+        made = XiangqiGame()
+
+        for origin, destination in [("h3", "e3"), ("h10", "g8"),
+                                    ("e3", "e7"), ("i10", "h10")]:
+            pushed.push((pos_index(origin), pos_index(destination)))
+            self.assertTrue(made.make_move(origin, destination))
+            self.assertEqual(pushed.get_hash(), made.get_hash())
+
+    # Tests whether popping every legal move after pushing it restores the
+    # position, hash, turn, and pieces
+    def test_push_pop_01(self):
+        xiangqi_game = XiangqiGame()
+        random_game(xiangqi_game, 40, 11)
+        fen = xiangqi_game.to_fen()
+        key = xiangqi_game.get_hash()
+        board = dict(xiangqi_game.get_board())
+        turn = xiangqi_game.get_turn()
+
+        for move in xiangqi_game.legal_moves(turn):
+            xiangqi_game.push(move)
+            self.assertEqual(xiangqi_game.pop(), move)
+            self.assertEqual(xiangqi_game.to_fen(), fen)
+            self.assertEqual(xiangqi_game.get_hash(), key)
+            self.assertEqual(xiangqi_game.get_turn(), turn)
+            self.assertEqual(xiangqi_game.get_board(), board)
+
+    # Tests whether popping a whole random game returns to the opening
+    # position, with every captured piece back where it was
+    def test_push_pop_02(self):
+        xiangqi_game = XiangqiGame()
+        fen = xiangqi_game.to_fen()
+        key = xiangqi_game.get_hash()
+        board = dict(xiangqi_game.get_board())
+        moves = random_game(xiangqi_game, 200, 3)
+
+        for move in reversed(moves):
+            self.assertEqual(xiangqi_game.pop(), move)
+
+        self.assertEqual(xiangqi_game.to_fen(), fen)
+        self.assertEqual(xiangqi_game.get_hash(), key)
+        self.assertEqual(xiangqi_game.get_board(), board)
+
+        for piece in board.values():
+
+            if piece != "-----------------":
+                self.assertIs(xiangqi_game.get_piece_at(piece.get_square()),
+                              piece)
+
+    # Tests whether make_move leaves no undo records behind, so a long game
+    # does not grow the undo stack
+    def test_push_pop_03(self):
+        generator = random.Random(4)
+        xiangqi_game = XiangqiGame()
+
+        for ply in range(200):
+            if xiangqi_game.get_game_state() != "UNFINISHED":
+                break
+
+            legal = xiangqi_game.legal_moves(xiangqi_game.get_turn())
+            origin, destination = generator.choice(legal)
+            self.assertTrue(xiangqi_game.make_move(index_pos(origin),
+                                                   index_pos(destination)))
+
+        self.assertRaises(IndexError, xiangqi_game.pop)
+
+    # Tests whether legal_captures gives exactly the captures among the legal
+    # moves, in and out of check, over the positions of several random games
+    def test_captures_01(self):
+        generator = random.Random(7)
+        xiangqi_game = XiangqiGame()
+        checks = 0
+
+        for game in range(12):
+            xiangqi_game.reset()
+
+            for ply in range(80):
+                player = xiangqi_game.get_turn()
+                cells = xiangqi_game.get_cells()
+                legal = xiangqi_game.legal_moves(player)
+                expected = {move for move in legal if cells[move[1]]}
+                captures = xiangqi_game.legal_captures(player)
+                self.assertEqual(len(captures), len(set(captures)))
+                self.assertEqual(set(captures),
+                                 expected,
+                                 msg="Captures differ at {}".format(
+                                     xiangqi_game.to_fen()))
+                checks += xiangqi_game.is_general_attacked(player)
+
+                if not legal:
+                    break
+
+                xiangqi_game.push(generator.choice(legal))
+
+        self.assertGreater(checks, 0)
+
+    # Tests whether the least valuable attacker of each player is found, and
+    # None where a player has no attacker
+    def test_attacker_01(self):
+        xiangqi_game = XiangqiGame.from_fen("5k3/9/3n5/9/R3r4/4P4/9/9/9/3K5 w")
+        square = pos_index("e6")
+        self.assertEqual(xiangqi_game.least_valuable_attacker(square, "red"),
+                         pos_index("e5"))
+        self.assertEqual(xiangqi_game.least_valuable_attacker(square, "black"),
+                         pos_index("d8"))
+        self.assertIsNone(xiangqi_game.least_valuable_attacker(
+            pos_index("i1"), "black"))
+
+    # Tests whether make_move traces its check test and rejected moves
+    def test_trace_01(self):
+        xiangqi_game = XiangqiGame()
+        messages = []
+        xiangqi_game.set_tracer(messages.append)
+        self.assertTrue(xiangqi_game.make_move("h3", "e3"))
+        self.assertFalse(xiangqi_game.make_move("e3", "e4"))
+        self.assertEqual(messages,
+                         ["check_check(black): False",
+                          "e3 to e4 rejected: not black's piece"],
+                         msg="Got {}".format(messages))
+
+    # Tests whether the opening position is written as the standard FEN
+    def test_fen_01(self):
+        fen = XiangqiGame().to_fen()
+        self.assertEqual(fen,
+                         START_FEN,
+                         msg="Expected {} got {}".format(START_FEN, fen))
+
+    # Tests whether positions from random games survive a FEN round trip with
+    # the same pieces on the same points and the same player to move
+    def test_fen_02(self):
+        xiangqi_game = XiangqiGame()
+
+        for seed in range(10):
+            xiangqi_game.reset()
+            random_game(xiangqi_game, 30 + seed * 7, seed)
+            fen = xiangqi_game.to_fen()
+            copy = XiangqiGame.from_fen(fen)
+            self.assertEqual(copy.to_fen(),
+                             fen,
+                             msg="Expected {} got {}".format(fen,
+                                                             copy.to_fen()))
+            self.assertEqual(copy.get_turn(), xiangqi_game.get_turn())
+
+            for position, piece in xiangqi_game.get_board().items():
+                other = copy.get_board()[position]
+
+                if piece == "-----------------":
+                    self.assertEqual(other, piece)
+
+                else:
+                    self.assertEqual((other.get_unit_type(),
+                                      other.get_player()),
+                                     (piece.get_unit_type(),
+                                      piece.get_player()))
+
+    # Tests whether "w" and "r" both give red the move and "b" gives black
+    # the move
+    def test_fen_03(self):
+        placement = START_FEN.split()[0]
+
+        for side, expected in [("w", "red"), ("r", "red"), ("b", "black")]:
+            turn = XiangqiGame.from_fen(placement + " " + side).get_turn()
+            self.assertEqual(turn,
+                             expected,
+                             msg="Expected {} got {}".format(expected, turn))
+
+    # Tests whether malformed FEN strings raise ValueError
+    def test_fen_04(self):
+        for fen in ["",
+                    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9 w",
+                    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/"
+                    "RNBAKABNR x",
+                    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/"
+                    "RNBAKABNX w",
+                    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/"
+                    "RNBAKABNR1 w",
+                    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/"
+                    "RNBA1ABNR w",
+                    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/4K4/"
+                    "RNBAKABNR w"]:
+            self.assertRaises(ValueError, XiangqiGame.from_fen, fen)
+
+    # Tests whether a position set up with the player to move in check is
+    # marked as such
+    def test_fen_05(self):
+        xiangqi_game = XiangqiGame.from_fen("4k4/9/9/9/9/9/9/9/3r5/3K5 w")
+        self.assertTrue(xiangqi_game.is_in_check("red"))
+        self.assertEqual(xiangqi_game.get_game_state(), "UNFINISHED")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
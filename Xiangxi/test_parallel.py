@@ -0,0 +1,141 @@
+import unittest
+import random
+from multiprocessing import shared_memory
+from XiangqiGame import XiangqiGame
+from XiangqiPerft import TEST_POSITIONS
+from XiangqiSearch import TranspositionTable
+from XiangqiSearch import XiangqiSearch
+from XiangqiParallel import LazySMPSearch
+from XiangqiParallel import RootSplitSearch
+from XiangqiParallel import SharedTranspositionTable
+
+
+class TestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.table = SharedTranspositionTable(1 << 12)
+
+    def tearDown(self):
+        self.table.close()
+        self.table.unlink()
+
+    # Tests whether the shared table gives the same probe results as a
+    # TranspositionTable of the same size over 20000 random operations
+    def test_table_01(self):
+        reference = TranspositionTable(1 << 12)
+        generator = random.Random(5)
+        self.assertEqual(self.table.get_size(), reference.get_size())
+
+        for operation in range(20000):
+            key = generator.getrandbits(64)
+            depth = generator.randint(1, 20)
+            score = generator.randint(-100050, 100050)
+            flag = generator.randint(0, 2)
+
+            if generator.random() < 0.1:
+                move = None
+
+            else:
+                move = (generator.randrange(90), generator.randrange(90))
+
+            if generator.random() < 0.01:
+                self.table.new_search()
+                reference.new_search()
+
+            self.table.store(key, depth, score, flag, move)
+            reference.store(key, depth, score, flag, move)
+
+            if generator.random() < 0.5:
+                key = generator.getrandbits(64)
+
+            shared = self.table.probe(key)
+            expected = reference.probe(key)
+
+            if expected is None:
+                self.assertIsNone(shared)
+
+            else:
+                self.assertEqual(shared[:5],
+                                 expected[:5],
+                                 msg="Expected {} got {}".format(expected,
+                                                                 shared))
+
+    # Tests whether a table attached by name sees the same entries, and
+    # whether clearing one clears the other
+    def test_table_02(self):
+        attached = SharedTranspositionTable(1 << 12,
+                                            name=self.table.get_name())
+        self.table.store(12345, 4, -17, TranspositionTable.LOWER, (0, 9))
+        self.assertEqual(attached.probe(12345)[:5],
+                         (12345, 4, -17, TranspositionTable.LOWER, (0, 9)))
+        attached.clear()
+        self.assertIsNone(self.table.probe(12345))
+        attached.close()
+
+    # Tests whether an entry torn by a concurrent write is treated as missing
+    def test_table_03(self):
+        self.table.store(12345, 4, -17, TranspositionTable.EXACT, (0, 9))
+        memory = shared_memory.SharedMemory(name=self.table.get_name())
+        words = memory.buf.cast("Q")
+
+        # Changing the data word alone leaves the hash check failing, as if
+        # another process had written half an entry.
+        for slot in range(0, len(words), 2):
+
+            if words[slot + 1]:
+                words[slot + 1] ^= 1 << 8
+
+        self.assertIsNone(self.table.probe(12345))
+        words.release()
+        memory.close()
+
+    # Tests whether a search using the shared table finds the same move and
+    # score as one using a TranspositionTable
+    def test_table_04(self):
+        for name, fen, counts in TEST_POSITIONS[:3]:
+            xiangqi_game = XiangqiGame(fen)
+            expected = XiangqiSearch().search(xiangqi_game, 3)
+            self.table.clear()
+            result = XiangqiSearch(table=self.table).search(xiangqi_game, 3)
+            self.assertEqual(result,
+                             expected,
+                             msg="{}: expected {} got {}".format(
+                                 name, expected, result))
+
+    # Tests whether a Lazy SMP search returns a legal move from a completed
+    # iteration and leaves the game unchanged
+    def test_lazy_smp_01(self):
+        search = LazySMPSearch(2, 1 << 14)
+
+        try:
+            xiangqi_game = XiangqiGame()
+            fen = xiangqi_game.to_fen()
+            move, score = search.search(xiangqi_game, 3)
+            self.assertIn(move, xiangqi_game.legal_moves("red"))
+            self.assertGreaterEqual(search.get_depth(), 3)
+            self.assertEqual(xiangqi_game.to_fen(), fen)
+
+        finally:
+            search.close()
+
+    # Tests whether a root-split search finds the same score as a serial
+    # search of the same depth
+    def test_root_split_01(self):
+        search = RootSplitSearch(2, 1 << 14)
+
+        try:
+            for name, fen, counts in TEST_POSITIONS[:3]:
+                xiangqi_game = XiangqiGame(fen)
+                expected = XiangqiSearch().search(xiangqi_game, 3)[1]
+                score = search.search(xiangqi_game, 3)[1]
+                self.assertEqual(score,
+                                 expected,
+                                 msg="{}: expected {} got {}".format(
+                                     name, expected, score))
+
+        finally:
+            search.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,47 @@
+import unittest
+from XiangqiReplay import parse_game
+from XiangqiReplay import read_games
+from XiangqiReplay import replay_games
+from XiangqiAnalyzer import analyze_archive
+
+
+class TestCase(unittest.TestCase):
+
+    # Tests whether a line with an odd number of positions raises ValueError
+    def test_parse_game_01(self):
+        self.assertRaises(ValueError, parse_game, "h3 e3 b10")
+
+    # Tests whether a non-strict parse ends with the unpaired position
+    def test_parse_game_02(self):
+        moves = parse_game("h3 e3 b10", strict=False)
+        expected = [("h3", "e3"), ("b10", None)]
+        self.assertEqual(moves,
+                         expected,
+                         msg="Expected {} got {}".format(expected, moves))
+
+    # Tests whether a truncated line in the middle of an archive is reported
+    # as one invalid game while the games after it are still replayed
+    def test_replay_games_01(self):
+        archive = ["h3 e3 h10 g8", "h3 e3 b10", "b3 e3 b10 c8"]
+        results = list(replay_games(read_games(archive)))
+        self.assertEqual([result["valid"] for result in results],
+                         [True, False, True])
+        self.assertEqual(results[1]["invalid_move"],
+                         ("b10", None),
+                         msg="Expected {} got {}".format(
+                             ("b10", None), results[1]["invalid_move"]))
+        self.assertEqual(results[1]["moves_played"], 1)
+
+    # Tests whether the analyzer counts a truncated line as an invalid game
+    def test_analyze_archive_01(self):
+        archive = ["h3 e3 h10 g8", "h3 e3 b10", "b3 e3 b10 c8"]
+        summary = analyze_archive(read_games(archive), processes=2)
+        self.assertEqual(summary["games"], 3)
+        self.assertEqual(summary["invalid_games"],
+                         [1],
+                         msg="Expected [1] got {}".format(
+                             summary["invalid_games"]))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
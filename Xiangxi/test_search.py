@@ -0,0 +1,149 @@
+import unittest
+import random
+from XiangqiEval import evaluate
+from XiangqiGame import XiangqiGame
+from XiangqiGame import pos_index
+from XiangqiSearch import MATE_SCORE
+from XiangqiSearch import XiangqiSearch
+from XiangqiSearch import static_exchange
+
+
+def random_positions(count, seed):
+    """
+    Returns a list of FEN strings for count positions reached by playing 16 to
+    40 random legal moves from the opening position.
+    """
+    generator = random.Random(seed)
+    xiangqi_game = XiangqiGame()
+    fens = []
+
+    while len(fens) < count:
+        xiangqi_game.reset()
+
+        for ply in range(generator.randrange(16, 40)):
+            moves = xiangqi_game.legal_moves(xiangqi_game.get_turn())
+
+            if not moves:
+                break
+
+            xiangqi_game.push(generator.choice(moves))
+
+        else:
+            fens.append(xiangqi_game.to_fen())
+
+    return fens
+
+
+class InterruptedFlag(object):
+    """
+    A stop flag for XiangqiSearch.search that raises RuntimeError when it is
+    read, standing in for an interruption in the middle of a search.
+    """
+
+    @property
+    def value(self):
+        raise RuntimeError("interrupted")
+
+
+class TestCase(unittest.TestCase):
+
+    # Tests whether think stays within a 200 ms budget on midgame positions
+    def test_think_01(self):
+        search = XiangqiSearch()
+
+        for fen in random_positions(10, 1):
+            xiangqi_game = XiangqiGame(fen)
+            result = search.think(xiangqi_game, time_ms=200)
+            self.assertLessEqual(result["time_ms"],
+                                 200,
+                                 msg="{} took {} ms".format(
+                                     fen, result["time_ms"]))
+
+    # Tests whether think stays within a 200 ms budget on the perft cannon
+    # exchange position
+    def test_think_02(self):
+        fen = ("1rbakabr1/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/9/9/RNBAKABNR"
+               " w - - 0 1")
+        xiangqi_game = XiangqiGame(fen)
+        result = XiangqiSearch().think(xiangqi_game, time_ms=200)
+        self.assertLessEqual(result["time_ms"],
+                             200,
+                             msg="Expected at most 200 ms, got {}".format(
+                                 result["time_ms"]))
+
+    # Tests whether think still returns a legal move and leaves the game
+    # unchanged when the time runs out
+    def test_think_03(self):
+        xiangqi_game = XiangqiGame()
+        fen = xiangqi_game.to_fen()
+        result = XiangqiSearch().think(xiangqi_game, time_ms=50)
+        self.assertIn(result["move"], xiangqi_game.legal_moves("red"))
+        self.assertEqual(xiangqi_game.to_fen(),
+                         fen,
+                         msg="Expected {}, got {}".format(
+                             fen, xiangqi_game.to_fen()))
+
+    # Tests whether think stops at the node budget
+    def test_think_04(self):
+        xiangqi_game = XiangqiGame()
+        result = XiangqiSearch().think(xiangqi_game, nodes=500)
+        self.assertLessEqual(result["nodes"],
+                             500,
+                             msg="Expected at most 500 nodes, got {}".format(
+                                 result["nodes"]))
+
+    # Tests whether think refuses to run without a time or node budget
+    def test_think_05(self):
+        self.assertRaises(ValueError, XiangqiSearch().think, XiangqiGame())
+
+    # Tests whether the game's own MoveCache is put back when the search is
+    # interrupted by an exception other than running out of budget
+    def test_search_01(self):
+        xiangqi_game = XiangqiGame()
+        move_cache = xiangqi_game.get_move_cache()
+        self.assertRaises(RuntimeError, XiangqiSearch().search, xiangqi_game,
+                          stop=InterruptedFlag())
+        self.assertIs(xiangqi_game.get_move_cache(), move_cache)
+
+    # Tests whether a soldier taking a chariot defended by a horse wins the
+    # chariot less the soldier
+    def test_static_exchange_01(self):
+        xiangqi_game = XiangqiGame("5k3/9/3n5/9/4r4/4P4/9/9/9/3K5 w")
+        fen = xiangqi_game.to_fen()
+        gain = static_exchange(xiangqi_game,
+                               (pos_index("e5"), pos_index("e6")))
+        self.assertEqual(gain, 80, msg="Expected 80 got {}".format(gain))
+        self.assertEqual(xiangqi_game.to_fen(), fen)
+
+    # Tests whether a cannon that gains a screen when its own chariot captures
+    # is counted as a recapture
+    def test_static_exchange_02(self):
+        move = (pos_index("e4"), pos_index("e7"))
+        xiangqi_game = XiangqiGame("5k3/9/9/r3n4/9/9/4R4/4B4/9/3KC4 w")
+        gain = static_exchange(xiangqi_game, move)
+        self.assertEqual(gain, 40, msg="Expected 40 got {}".format(gain))
+
+        # Without the cannon the chariot is lost for the horse.
+        xiangqi_game = XiangqiGame("5k3/9/9/r3n4/9/9/4R4/4B4/9/3K5 w")
+        gain = static_exchange(xiangqi_game, move)
+        self.assertEqual(gain, -50, msg="Expected -50 got {}".format(gain))
+
+    # Tests whether the quiescence search stands pat without searching a
+    # chariot's capture of a soldier defended by a horse
+    def test_quiesce_01(self):
+        xiangqi_game = XiangqiGame("5k3/3n5/9/4p4/9/9/4R4/9/9/3K5 w")
+        move = (pos_index("e4"), pos_index("e7"))
+        self.assertEqual(xiangqi_game.legal_captures("red"), (move,))
+        self.assertEqual(static_exchange(xiangqi_game, move), -80)
+
+        search = XiangqiSearch()
+        score = search._quiesce(xiangqi_game, -MATE_SCORE, MATE_SCORE, 0)
+        self.assertEqual(score, evaluate(xiangqi_game))
+        self.assertEqual(search.get_nodes(),
+                         1,
+                         msg="Expected 1 node got {}".format(
+                             search.get_nodes()))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
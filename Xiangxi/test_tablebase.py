@@ -0,0 +1,170 @@
+import unittest
+import filecmp
+import random
+import shutil
+import tempfile
+from XiangqiGame import XiangqiGame
+from XiangqiGame import cells_to_fen
+from XiangqiSearch import MATE_SCORE
+from XiangqiSearch import XiangqiSearch
+from XiangqiTablebase import Tablebase
+from XiangqiTablebase import TableLayout
+from XiangqiTablebase import build_table
+from XiangqiTablebase import format_signature
+from XiangqiTablebase import parse_signature
+from XiangqiTablebase import sub_signatures
+from XiangqiTablebase import table_path
+
+
+def expected_value(child_values):
+    """
+    Returns the value a position should have from the values of its
+    children, each from the point of view of the player to move there.
+    """
+    if not child_values:
+        return -1
+
+    losses = [-value - 1 for value in child_values if value < 0]
+
+    if losses:
+        return min(losses) + 1
+
+    if 0 in child_values:
+        return 0
+
+    # Every move lets the opponent win, so the position is mated one ply after
+    # the slowest of those wins.
+    return -(max(child_values) + 1) - 1
+
+
+class TestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # The chariot ending is built once with one process and once with
+        # two, and shared by every test.
+        cls.serial = tempfile.mkdtemp()
+        cls.parallel = tempfile.mkdtemp()
+        build_table("KRvK", cls.serial, processes=1)
+        build_table("KRvK", cls.parallel, processes=2, chunk_size=1024)
+        cls.tablebase = Tablebase(cls.serial)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        shutil.rmtree(cls.serial)
+        shutil.rmtree(cls.parallel)
+
+    # Tests whether signatures are read and written in canonical form
+    def test_signature_01(self):
+        signature = format_signature(parse_signature("khvkaee"))
+        self.assertEqual(signature,
+                         "KNvKABB",
+                         msg="Expected KNvKABB got {}".format(signature))
+
+    # Tests whether invalid signatures raise ValueError
+    def test_signature_02(self):
+        for signature in ["KRK", "KRvKK", "RvK", "KXvK"]:
+            self.assertRaises(ValueError, parse_signature, signature)
+
+    # Tests whether the smaller signatures reached by one capture are listed
+    def test_signature_03(self):
+        subs = sub_signatures("KRvKA")
+        self.assertEqual(sorted(subs), ["KRvK", "KvKA"])
+
+    # Tests whether a serial build and a parallel build write identical
+    # tables
+    def test_build_01(self):
+        for signature in ["KvK", "KRvK"]:
+            self.assertTrue(filecmp.cmp(table_path(self.serial, signature),
+                                        table_path(self.parallel, signature),
+                                        shallow=False),
+                            msg="{} differs".format(signature))
+
+    # Tests whether every stored value agrees with the values of the
+    # position's children, generated with the game's own legal moves
+    def test_probe_01(self):
+        layout = TableLayout("KRvK")
+        xiangqi_game = XiangqiGame()
+        xiangqi_game.set_move_cache(None)
+
+        for index in range(layout.get_size()):
+            position = layout.cells(index)
+
+            if position is None:
+                continue
+
+            cells, black_to_move = position
+            player = "black" if black_to_move else "red"
+            other = "red" if black_to_move else "black"
+            xiangqi_game.reset(cells_to_fen(cells, player))
+            value = self.tablebase.probe_cells(cells, black_to_move)
+
+            if xiangqi_game.is_general_attacked(other):
+                self.assertIsNone(value)
+                continue
+
+            child_values = []
+
+            for move in xiangqi_game.legal_moves(player):
+                xiangqi_game.push(move)
+                child_values.append(self.tablebase.probe_cells(
+                    xiangqi_game.get_cells(), not black_to_move))
+                xiangqi_game.pop()
+
+            self.assertEqual(value,
+                             expected_value(child_values),
+                             msg="Wrong value at {}".format(
+                                 xiangqi_game.to_fen()))
+
+    # Tests whether probe reports a known mate in one and the mated position
+    def test_probe_02(self):
+        xiangqi_game = XiangqiGame("3k5/9/9/9/9/9/9/9/9/R3K4 w")
+        self.assertEqual(self.tablebase.probe(xiangqi_game), ("win", 1))
+        self.assertTrue(xiangqi_game.make_move("a1", "d1"))
+        self.assertEqual(self.tablebase.probe(xiangqi_game), ("loss", 0))
+
+    # Tests whether positions without a table probe as None
+    def test_probe_03(self):
+        self.assertIsNone(self.tablebase.probe(XiangqiGame()))
+
+    # Tests whether the search finds the same distance to mate as the table
+    # for short wins and losses
+    def test_search_01(self):
+        layout = TableLayout("KRvK")
+        generator = random.Random(0)
+        indices = list(range(layout.get_size()))
+        generator.shuffle(indices)
+        checked = 0
+
+        for index in indices:
+            position = layout.cells(index)
+
+            if position is None:
+                continue
+
+            cells, black_to_move = position
+            value = self.tablebase.probe_cells(cells, black_to_move)
+
+            if value is None or not (0 < value <= 3 or -4 <= value < 0):
+                continue
+
+            plies = value if value > 0 else -value - 1
+            expected = MATE_SCORE - plies if value > 0 else (
+                -MATE_SCORE + plies)
+            xiangqi_game = XiangqiGame(cells_to_fen(
+                cells, "black" if black_to_move else "red"))
+            move, score = XiangqiSearch(1 << 12).search(xiangqi_game,
+                                                        max_depth=plies + 1)
+            self.assertEqual(score,
+                             expected,
+                             msg="Expected {} got {} at {}".format(
+                                 expected, score, xiangqi_game.to_fen()))
+            checked += 1
+
+            if checked == 10:
+                break
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)